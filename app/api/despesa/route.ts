@@ -2,18 +2,42 @@ import { NextResponse } from "next/server";
 import fs from "fs";
 import path from "path";
 
+type SectorEntry = { sector: string; shard: string };
+
+// Shard file of one sector, from the per-year index written by the despesa extractors
+function sectorShardPath(year: string, sector: string): string | null {
+  const yearDir = path.join(process.cwd(), "public", "despesa", year);
+  const indexPath = path.join(yearDir, "index.json");
+  if (!fs.existsSync(indexPath)) {
+    return null;
+  }
+  const index = JSON.parse(fs.readFileSync(indexPath, "utf8"));
+  const entry = (index[year]?.setores as SectorEntry[] | undefined)?.find((s) => s.sector === sector);
+  return entry ? path.join(yearDir, entry.shard) : null;
+}
+
 export async function GET(request: Request) {
   const { searchParams } = new URL(request.url);
   const year = searchParams.get("year") || "2023"; // Default to 2023 if no year is provided
   const sector = searchParams.get("sector");
-  
+
   try {
+    // Return specific sector data if requested: only that sector's shard is read
+    if (sector && /^\d{4}$/.test(year)) {
+      const shardPath = sectorShardPath(year, sector);
+      if (shardPath) {
+        return new NextResponse(fs.readFileSync(shardPath), {
+          headers: { "Content-Type": "application/json" },
+        });
+      }
+    }
+
     // Read the data from the JSON file
     const filePath = path.join(process.cwd(), "public", "despesa", `${year}.json`);
     const fileData = fs.readFileSync(filePath, "utf8");
     const budgetData = JSON.parse(fileData);
-    
-    // Return specific sector data if requested
+
+    // Years without shards still answer sector requests from the full file
     if (sector && budgetData[year]?.setores[sector]) {
       return NextResponse.json({
         [year]: {
@@ -22,15 +46,15 @@ export async function GET(request: Request) {
         }
       });
     }
-    
+
     // Just return the whole data structure as it already has the correct format
     return NextResponse.json(budgetData);
-    
+
   } catch (error) {
     console.error("Error reading budget data:", error);
     return NextResponse.json(
-      { error: "Failed to load budget data" }, 
+      { error: "Failed to load budget data" },
       { status: 500 }
     );
   }
-}
\ No newline at end of file
+}
@@ -3,13 +3,21 @@
 import { useState, useEffect } from "react"
 import { Line, LineChart, CartesianGrid, XAxis, YAxis, Tooltip, Legend, ResponsiveContainer } from "recharts"
 import { ChartContainer } from "@/components/ui/chart"
+import { fetchData } from "@/lib/data-manifest"
 
 interface BalanceData {
   year: string
-  receitaActual: number
-  despesaActual: number
-  saldoActual: number
-  pibPercentage: number
+  receitaActual: number | null
+  despesaActual: number | null
+  saldoActual: number | null
+  pibPercentage: number | null
+}
+
+// public/series/balanco.json (public/data/series.py): every year of each rubrica in one file,
+// executado being the actual value and orcamentado the budget (null where a year has none)
+interface BalancoSeries {
+  anos: number[]
+  rubricas: Record<string, Record<string, { executado: number | null, orcamentado: number | null } | null>>
 }
 
 export function BudgetOverviewTrends() {
@@ -23,35 +31,32 @@ export function BudgetOverviewTrends() {
       setError(null)
       
       try {
-        // Fetch balance data for years 2013-2023
-        const response = await fetch('/api/balance?startYear=2013&endYear=2023')
+        // One file with every year of the balance
+        const series = await fetchData<BalancoSeries>("series/balanco.json")
         
-        if (!response.ok) {
-          throw new Error('Failed to fetch budget balance data')
+        // Actual value (not the budget value) of a rubrica in a year, rounded to 2 decimals
+        const actual = (rubrica: string, year: string, scale = 1) => {
+          const value = series.rubricas[rubrica]?.[year]?.executado
+          return value !== null && value !== undefined ? Number((value * scale).toFixed(2)) : null
         }
         
-        const jsonData = await response.json()
-        
-        // Transform the data for the chart, but only include actual values (not budget values)
-        const chartData = Object.entries(jsonData).map(([year, yearData]: [string, any]) => {
-          // Skip years with missing/malformed data
-          if (!yearData || !yearData.Receita || !yearData.Despesa) {
-            console.warn(`Missing or invalid data for year ${year}`)
-            return null
-          }
-          
-          return {
+        const chartData = series.anos
+          .map(String)
+          .filter(year => {
+            // Skip years with missing data
+            const missing = actual("Receita", year) === null || actual("Despesa", year) === null
+            if (missing) {
+              console.warn(`Missing or invalid data for year ${year}`)
+            }
+            return !missing
+          })
+          .map(year => ({
             year,
-            receitaActual: yearData.Receita.Year !== undefined ? Number((yearData.Receita.Year).toFixed(2)) : null,
-            despesaActual: yearData.Despesa.Year !== undefined ? Number((yearData.Despesa.Year).toFixed(2)) : null,
-            saldoActual: yearData.Saldo?.Year !== undefined ? Number((yearData.Saldo.Year).toFixed(2)) : null,
-            pibPercentage: yearData.PIBper?.Year !== undefined ? Number((yearData.PIBper.Year * 100).toFixed(2)) : null,
-          }
-        })
-        .filter(item => item !== null) // Remove any null items
-        
-        // Sort by year
-        chartData.sort((a, b) => parseInt(a.year) - parseInt(b.year))
+            receitaActual: actual("Receita", year),
+            despesaActual: actual("Despesa", year),
+            saldoActual: actual("Saldo", year),
+            pibPercentage: actual("PIBper", year, 100),
+          }))
         
         setData(chartData)
       } catch (err) {
@@ -23,8 +23,9 @@ import { Loader2, ArrowUpIcon, ArrowDownIcon, MinusIcon } from "lucide-react"
 import { Checkbox } from "@/components/ui/checkbox"
 import { Label } from "@/components/ui/label"
 import { Badge } from "@/components/ui/badge"
+import { fetchData } from "@/lib/data-manifest"
 
-// Years to fetch data for
+// Years shown in the chart
 const YEARS = ["2015", "2016", "2017", "2018", "2019", "2020", "2021", "2022", "2023"]
 
 type DistrictData = {
@@ -37,15 +38,19 @@ type MunicipalityData = {
   [municipalityName: string]: number
 }
 
-type TransferData = {
-  Total: number
-  Year: string
-  Districts: Array<{
-    District: string
-    Total: number
-    NationalPercentage: string
-    Municipalities?: Record<string, number>
-  }>
+// Precomputed series (public/data/series.py): series/transferencias.json has every year of the national
+// total and of every district, series/transferencias/<district>.json every year of each of its
+// municipalities; null where a year has no value
+type TransferenciasSeries = {
+  anos: number[]
+  total: Record<string, number | null>
+  distritos: Record<string, Record<string, number | null>>
+  ficheiros: Record<string, string>
+}
+
+type DistrictSeries = {
+  district: string
+  municipios: Record<string, Record<string, number | null>>
 }
 
 // Color palette for the lines
@@ -65,7 +70,8 @@ const COLORS = [
 export function DistrictTrends() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
-  const [yearData, setYearData] = useState<Record<string, TransferData>>({})
+  const [series, setSeries] = useState<TransferenciasSeries | null>(null)
+  const [districtSeries, setDistrictSeries] = useState<DistrictSeries | null>(null)
   const [districts, setDistricts] = useState<string[]>([])
   const [selectedDistrict, setSelectedDistrict] = useState<string | null>(null)
   const [municipalities, setMunicipalities] = useState<string[]>([])
@@ -93,110 +99,68 @@ export function DistrictTrends() {
     }`;
   }
 
-  // Fetch data for all years
+  // Transfers to a district, to a municipality of the selected district or to the whole country in a year
+  // (undefined when there is no value)
+  const districtValue = (district: string, year: string) => series?.distritos[district]?.[year] ?? undefined
+  const municipalityValue = (municipality: string, year: string) =>
+    districtSeries?.municipios[municipality]?.[year] ?? undefined
+  const nationalTotal = (year: string) => series?.total[year] ?? undefined
+
+  // Fetch the series of every district: one file with all the years
   useEffect(() => {
-    const fetchAllYearData = async () => {
-      setLoading(true)
-      setError(null)
-      
-      try {
-        const result: Record<string, TransferData> = {}
-        
-        // Fetch data for each year
-        for (const year of YEARS) {
-          const response = await fetch(`/api/transfers?year=${year}&level=municipality`)
-          
-          if (!response.ok) {
-            throw new Error(`Failed to load data for ${year}`)
-          }
-          
-          const data = await response.json()
-          result[year] = data
-        }
-        
-        setYearData(result)
-        
-        // Extract all district names from the first year's data
-        const districtNames = result[YEARS[0]]?.Districts.map(d => d.District) || []
-        setDistricts(districtNames)
-        
-        // Calculate trends for districts and municipalities
-        calculateTrends(result, baseYear)
-        
+    setLoading(true)
+    setError(null)
+
+    fetchData<TransferenciasSeries>("series/transferencias.json")
+      .then(data => {
+        setSeries(data)
+        setDistricts(Object.keys(data.distritos))
         setLoading(false)
-      } catch (err) {
+      })
+      .catch(err => {
         console.error("Error fetching transfer data:", err)
         setError(err instanceof Error ? err.message : "Failed to load data")
         setLoading(false)
-      }
-    }
-    
-    fetchAllYearData()
+      })
   }, [])
   
-  // Recalculate trends when base year changes
+  // Recalculate trends when the base year or the data change
   useEffect(() => {
-    if (Object.keys(yearData).length > 0) {
-      calculateTrends(yearData, baseYear)
+    if (series) {
+      calculateTrends(baseYear)
     }
-  }, [baseYear, yearData])
+  }, [baseYear, series, districtSeries])
   
-  // Calculate trends for districts and municipalities
-  const calculateTrends = (data: Record<string, TransferData>, fromYear: string) => {
+  // Calculate trends for districts and for the municipalities of the selected district
+  const calculateTrends = (fromYear: string) => {
     const trends: Record<string, { trend: 'up' | 'down' | 'neutral', percentage: number, absoluteChange: number }> = {}
     
-    // We need at least two years of data to calculate trends
-    if (Object.keys(data).length < 2) return
-    
     // Use the selected base year and the last year to compare
     const firstYear = fromYear
     const lastYear = YEARS[YEARS.length - 1]
     
     // Skip calculation if base year is the last year
-    if (firstYear === lastYear) {
+    if (!series || firstYear === lastYear) {
       setTrendData({})
       return
     }
     
-    // Calculate district trends
-    data[firstYear]?.Districts.forEach(district => {
-      const districtName = district.District
-      const firstYearValue = district.Total
-      
-      // Find the same district in the last year
-      const lastYearDistrict = data[lastYear]?.Districts.find(
-        d => d.District === districtName
-      )
-      
-      if (lastYearDistrict) {
-        const lastYearValue = lastYearDistrict.Total
-        const diff = lastYearValue - firstYearValue
-        const percentChange = (diff / firstYearValue) * 100
-        
-        trends[districtName] = {
-          trend: diff > 0 ? 'up' : diff < 0 ? 'down' : 'neutral',
-          percentage: Math.abs(percentChange),
-          absoluteChange: diff
-        }
-        
-        // Calculate trends for municipalities if they exist
-        if (district.Municipalities && lastYearDistrict.Municipalities) {
-          Object.entries(district.Municipalities).forEach(([muniName, muniValue]) => {
-            const lastYearMuniValue = lastYearDistrict.Municipalities?.[muniName]
-            
-            if (lastYearMuniValue !== undefined) {
-              const muniDiff = lastYearMuniValue - muniValue
-              const muniPercentChange = (muniDiff / muniValue) * 100
-              
-              trends[muniName] = {
-                trend: muniDiff > 0 ? 'up' : muniDiff < 0 ? 'down' : 'neutral',
-                percentage: Math.abs(muniPercentChange),
-                absoluteChange: muniDiff
-              }
-            }
-          })
-        }
+    // Only names with a value in both years get a trend
+    const addTrend = (name: string, firstYearValue?: number, lastYearValue?: number) => {
+      if (firstYearValue === undefined || lastYearValue === undefined) return
+      const diff = lastYearValue - firstYearValue
+      trends[name] = {
+        trend: diff > 0 ? 'up' : diff < 0 ? 'down' : 'neutral',
+        percentage: Math.abs((diff / firstYearValue) * 100),
+        absoluteChange: diff
       }
+    }
+    
+    Object.keys(series.distritos).forEach(districtName => {
+      addTrend(districtName, districtValue(districtName, firstYear), districtValue(districtName, lastYear))
+    })
+    Object.keys(districtSeries?.municipios ?? {}).forEach(muniName => {
+      addTrend(muniName, municipalityValue(muniName, firstYear), municipalityValue(muniName, lastYear))
     })
     
     setTrendData(trends)
@@ -230,92 +194,63 @@ export function DistrictTrends() {
     )
   }
   
-  // Update municipalities when district changes
+  // Fetch the series of the selected district's municipalities when the district changes
   useEffect(() => {
-    if (!selectedDistrict || !yearData || Object.keys(yearData).length === 0) {
-      setMunicipalities([])
-      setSelectedMunicipalities([])
-      return
-    }
+    setDistrictSeries(null)
+    setMunicipalities([])
+    setSelectedMunicipalities([])
     
-    // Find the selected district in the latest year
-    const latestYear = YEARS[YEARS.length - 1]
-    const district = yearData[latestYear]?.Districts.find(
-      d => d.District === selectedDistrict
-    )
+    const file = selectedDistrict ? series?.ficheiros[selectedDistrict] : undefined
+    if (!file) return
     
-    if (district?.Municipalities) {
-      const municipalityNames = Object.keys(district.Municipalities)
-      setMunicipalities(municipalityNames)
-      
-      // Reset selected municipalities
-      setSelectedMunicipalities([])
-    } else {
-      setMunicipalities([])
-      setSelectedMunicipalities([])
+    let cancelled = false
+    fetchData<DistrictSeries>(`series/transferencias/${file}`)
+      .then(data => {
+        if (cancelled) return
+        setDistrictSeries(data)
+        
+        // Municipalities of the district in the latest year
+        const latestYear = YEARS[YEARS.length - 1]
+        setMunicipalities(Object.keys(data.municipios).filter(name => data.municipios[name][latestYear] != null))
+      })
+      .catch(err => console.error("Error fetching district data:", err))
+    return () => {
+      cancelled = true
     }
-  }, [selectedDistrict, yearData])
+  }, [selectedDistrict, series])
   
-  // Prepare data for the chart
+  // Prepare data for the chart from the series
   const chartData = YEARS.map(year => {
-    const yearDataObj = yearData[year] || { Total: 0, Districts: [] }
+    const total = nationalTotal(year) ?? 0
     
     // Start with the year as the base object
     const dataPoint: Record<string, any> = {
       year,
-      Total: (yearDataObj.Total / 1000000).toFixed(2), // Convert to millions
+      Total: (total / 1000000).toFixed(2), // Convert to millions
     }
     
-    // If no district is selected, show totals for all selected districts
+    // Millions of euros or percentage of the national total; names without a value in the year are left out
+    const addPoint = (name: string, value?: number) => {
+      if (value === undefined) return
+      dataPoint[name] = selectedType === 'absolute'
+        ? (value / 1000000).toFixed(2)
+        : ((value / total) * 100).toFixed(2)
+    }
+    
+    // If no district is selected, show totals for all districts
     if (!selectedDistrict) {
-      districts.forEach(districtName => {
-        const district = yearDataObj.Districts.find(d => d.District === districtName)
-        if (district) {
-          if (selectedType === 'absolute') {
-            dataPoint[districtName] = (district.Total / 1000000).toFixed(2) // Convert to millions
-          } else {
-            dataPoint[districtName] = Number(district.NationalPercentage).toFixed(2) // Percentage
-          }
-        }
-      })
+      districts.forEach(districtName => addPoint(districtName, districtValue(districtName, year)))
     } 
     // If a district is selected but no municipalities, show district total
-    else if (selectedDistrict && selectedMunicipalities.length === 0 && !showAllMunicipalities) {
-      const district = yearDataObj.Districts.find(d => d.District === selectedDistrict)
-      if (district) {
-        if (selectedType === 'absolute') {
-          dataPoint[selectedDistrict] = (district.Total / 1000000).toFixed(2) // Convert to millions
-        } else {
-          dataPoint[selectedDistrict] = Number(district.NationalPercentage).toFixed(2) // Percentage
-        }
-      }
+    else if (selectedMunicipalities.length === 0 && !showAllMunicipalities) {
+      addPoint(selectedDistrict, districtValue(selectedDistrict, year))
     } 
     // If showing all municipalities or specific municipalities
     else {
-      const district = yearDataObj.Districts.find(d => d.District === selectedDistrict)
-      if (district?.Municipalities) {
-        // Add district total if requested
-        if (selectedType === 'absolute') {
-          dataPoint[selectedDistrict] = (district.Total / 1000000).toFixed(2) // Convert to millions
-        } else {
-          dataPoint[selectedDistrict] = Number(district.NationalPercentage).toFixed(2) // Percentage
-        }
-
-        // Add municipality data
-        const municipalitiesToShow = showAllMunicipalities 
-          ? Object.keys(district.Municipalities) 
-          : selectedMunicipalities
-        
-        municipalitiesToShow.forEach(muni => {
-          if (district.Municipalities && district.Municipalities[muni]) {
-            if (selectedType === 'absolute') {
-              dataPoint[muni] = (district.Municipalities[muni] / 1000000).toFixed(2) // Convert to millions
-            } else {
-              dataPoint[muni] = ((district.Municipalities[muni] / yearDataObj.Total) * 100).toFixed(2) // Calculate percentage
-            }
-          }
-        })
-      }
+      addPoint(selectedDistrict, districtValue(selectedDistrict, year))
+      
+      const municipalitiesToShow = showAllMunicipalities ? municipalities : selectedMunicipalities
+      municipalitiesToShow.forEach(muni => addPoint(muni, municipalityValue(muni, year)))
     }
     
     return dataPoint
@@ -7,6 +7,7 @@ import { DistrictNewsArticles } from "@/components/district-news-articles";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Euro } from "lucide-react";
 import { useIsMobile } from "@/hooks/use-mobile";
+import { dataUrl } from "@/lib/data-manifest";
 
 type TransferData = {
   Total: number;
@@ -56,7 +57,8 @@ export function MapContainer() {
     setError(null);
 
     // Fetch transfer data
-    fetch(`/api/transfers?year=${selectedYear}&level=municipality`)
+    dataUrl(`municipality_transfers/municipality/${selectedYear}.json`, `/api/transfers?year=${selectedYear}&level=municipality`)
+      .then(url => fetch(url))
       .then(response => {
         if (!response.ok) {
           throw new Error(`Failed to load transfer data: ${response.status} ${response.statusText}`);
@@ -25,6 +25,7 @@ interface MapYearSelectorProps {
 }
 
 const years = [
+  { value: "2014", label: "2014" },
   { value: "2015", label: "2015" },
   { value: "2016", label: "2016" },
   { value: "2017", label: "2017" },
@@ -17,8 +17,8 @@ export function PortugalGeoMap({ year, data }: PortugalGeoMapProps) {
   useEffect(() => {
     setIsMounted(true);
 
-    // Load the GeoJSON data only on the client side
-    fetch("/gadm41_PRT_1.json")
+    // Load the TopoJSON built by public/data/topologia.py only on the client side
+    fetch("/gadm41_PRT_1.topo.json")
       .then((response) => response.json())
       .then((topology) => {
         const geojson = feature(topology, topology.objects.gadm41_PRT_1);
@@ -5,6 +5,7 @@ import { ComposableMap, Geographies, Geography, ZoomableGroup } from "react-simp
 import { Card, CardContent } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { ArrowLeft } from "lucide-react"
+import { dataUrl } from "@/lib/data-manifest"
 
 type DistrictInfo = {
   id: string
@@ -83,9 +84,9 @@ export function PortugalMap({ selectedYear, onDistrictClick, externalSelectedDis
   const [municipalitiesData, setMunicipalitiesData] = useState<any>(null)
   const [transferData, setTransferData] = useState<TransferData | null>(null)
 
-  // URLs for GeoJSON files
-  const districtGeoUrl = "gadm41_PRT_1.json"
-  const municipalitiesGeoUrl = "gadm41_PRT_2.json"
+  // TopoJSON files (simplified and quantized from the GADM GeoJSON by public/data/topologia.py)
+  const districtGeoUrl = "gadm41_PRT_1.topo.json"
+  const municipalitiesGeoUrl = "gadm41_PRT_2.topo.json"
 
   // Sync internal selectedDistrict with external state if provided
   useEffect(() => {
@@ -306,7 +307,8 @@ export function PortugalMap({ selectedYear, onDistrictClick, externalSelectedDis
       });
 
     // Fetch transfer data with municipality level information
-    fetch(`/api/transfers?year=${selectedYear}&level=municipality`)
+    dataUrl(`municipality_transfers/municipality/${selectedYear}.json`, `/api/transfers?year=${selectedYear}&level=municipality`)
+      .then(url => fetch(url))
       .then(response => {
         if (!response.ok) {
           throw new Error(`Failed to load transfer data: ${response.status} ${response.statusText}`);
@@ -24,28 +24,28 @@ import { Checkbox } from "@/components/ui/checkbox"
 import { Label } from "@/components/ui/label"
 import { Badge } from "@/components/ui/badge"
 import { Alert, AlertDescription } from "@/components/ui/alert"
+import { fetchData } from "@/lib/data-manifest"
 
-// Years to fetch data for
+// Years shown in the chart
 const YEARS = ["2015", "2016", "2017", "2018", "2019", "2020", "2021", "2022", "2023"]
 
-// Define types for the new data format
-interface BudgetData {
-  [year: string]: {
-    despesa_orcamentada: number;
-    despesa_executada_efetiva_consolidada: number;
-    grau_execução: number;
-    setores: {
-      [key: string]: {
-        despesa_orcamentada: number;
-        despesa_executada_efetiva_consolidada: number;
-        despesa_executada_total_nao_consolidada: number;
-        grau_execução: number;
-        medidas: {
-          [key: string]: number;
-        };
-      };
-    };
-  };
+// Precomputed series (public/data/series.py): series/despesa.json has every year of every sector,
+// series/despesa/<sector>.json every year of each of its medidas; null where a year has no value
+type SectorYear = {
+  orcamentado: number | null;
+  executado: number | null;
+  grau_execucao: number | null;
+}
+
+interface DespesaSeries {
+  anos: number[];
+  setores: { [sector: string]: { [year: string]: SectorYear | null } };
+  ficheiros: { [sector: string]: string };
+}
+
+interface SectorSeries {
+  sector: string;
+  medidas: { [medida: string]: { [year: string]: number | null } };
 }
 
 // Color palette for the lines
@@ -65,7 +65,8 @@ const COLORS = [
 export function SectorTrends() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
-  const [yearData, setYearData] = useState<Record<string, BudgetData>>({})
+  const [series, setSeries] = useState<DespesaSeries | null>(null)
+  const [sectorSeries, setSectorSeries] = useState<SectorSeries | null>(null)
   const [sectors, setSectors] = useState<string[]>([])
   // Track sectors that exist in all years or just some years
   const [sectorsInAllYears, setSectorsInAllYears] = useState<Set<string>>(new Set())
@@ -131,164 +132,89 @@ export function SectorTrends() {
     });
   };
 
-  // Fetch data for all years
+  // Executed expense of a sector or of a medida of the selected sector in a year (undefined when it has no value)
+  const sectorValue = (sector: string, year: string) => series?.setores[sector]?.[year]?.executado ?? undefined
+  const medidaValue = (medida: string, year: string) => sectorSeries?.medidas[medida]?.[year] ?? undefined
+
+  // Total executed expense of a year, as the sum of its sectors
+  const yearTotal = (year: string) =>
+    Object.keys(series?.setores ?? {}).reduce((acc, sector) => acc + (sectorValue(sector, year) ?? 0), 0)
+
+  const inAllYears = (serie: { [year: string]: unknown }) => YEARS.every(year => serie[year] != null)
+
+  // Fetch the series of every sector: one file with all the years
   useEffect(() => {
-    const fetchAllYearData = async () => {
-      setLoading(true)
-      setError(null)
-      
-      try {
-        const result: Record<string, BudgetData> = {}
-        
-        // Fetch data for each year
-        for (const year of YEARS) {
-          const response = await fetch(`/api/despesa?year=${year}`)
-          
-          if (!response.ok) {
-            throw new Error(`Failed to load data for ${year}`)
-          }
-          
-          const data = await response.json()
-          result[year] = data
-        }
-        
-        setYearData(result)
-        
-        // Extract all sector names from all years to identify sectors present in all years vs. partial years
-        const sectorsByYear = new Map<string, Set<string>>()
-        const allSectors = new Set<string>()
-        
-        // First gather all sectors by year and collect all unique sector names
-        YEARS.forEach(year => {
-          const yearSectors = new Set<string>()
-          if (result[year]?.[year]?.setores) {
-            Object.keys(result[year][year].setores).forEach(sectorName => {
-              yearSectors.add(sectorName)
-              allSectors.add(sectorName)
-            })
-          }
-          sectorsByYear.set(year, yearSectors)
-        })
-        
-        // Then determine which sectors are in all years vs. partial years
-        const inAllYears = new Set<string>()
-        const inPartialYears = new Set<string>()
-        
-        allSectors.forEach(sector => {
-          let inAll = true
-          for (const year of YEARS) {
-            if (!sectorsByYear.get(year)?.has(sector)) {
-              inAll = false
-              break
-            }
-          }
-          
-          if (inAll) {
-            inAllYears.add(sector)
-          } else {
-            inPartialYears.add(sector)
-          }
-        })
-        
-        setSectorsInAllYears(inAllYears)
-        setPartialSectors(inPartialYears)
-        
+    setLoading(true)
+    setError(null)
+
+    fetchData<DespesaSeries>("series/despesa.json")
+      .then(data => {
+        setSeries(data)
+
+        // Sectors with a value in every year vs. only in some of them
+        const allSectors = Object.keys(data.setores)
+        setSectorsInAllYears(new Set(allSectors.filter(sector => inAllYears(data.setores[sector]))))
+        setPartialSectors(new Set(allSectors.filter(sector => !inAllYears(data.setores[sector]))))
+
         // Use all sectors as the initial list, sort them alphabetically
-        setSectors([...allSectors].sort())
-        
-        // Calculate trends for sectors and subsectors
-        calculateTrends(result, baseYear)
-        
+        setSectors(allSectors.sort())
         setLoading(false)
-      } catch (err) {
+      })
+      .catch(err => {
         console.error("Error fetching budget data:", err)
         setError(err instanceof Error ? err.message : "Failed to load data")
         setLoading(false)
-      }
-    }
-    
-    fetchAllYearData()
+      })
   }, [])
   
-  // Recalculate trends when base year changes
+  // Recalculate trends when the years compared or the data change
   useEffect(() => {
-    if (Object.keys(yearData).length > 0) {
-      calculateTrends(yearData, baseYear)
+    if (series) {
+      calculateTrends(baseYear)
     }
-  }, [baseYear, yearData])
+  }, [baseYear, endYear, series, sectorSeries])
   
-  // Calculate trends for sectors and subsectors with new data structure
-  const calculateTrends = (data: Record<string, BudgetData>, fromYear: string) => {
+  // Calculate trends for sectors and for the medidas of the selected sector
+  const calculateTrends = (fromYear: string) => {
     const trends: Record<string, { trend: 'up' | 'down' | 'neutral', percentage: number }> = {}
     
-    // We need at least two years of data to calculate trends
-    if (Object.keys(data).length < 2) return
-    
     // Use the selected base year and the selected end year to compare
     const firstYear = fromYear
     const lastYear = endYear
     
     // Skip calculation if base year is the last year
-    if (firstYear === lastYear) {
+    if (!series || firstYear === lastYear) {
       setTrendData({})
       return
     }
     
-    // Check if data is available for both years
-    if (!data[firstYear]?.[firstYear] || !data[lastYear]?.[lastYear]) {
-      console.warn("Missing data for trend calculation")
-      return
-    }
-    
-    // Calculate sector trends
-    const firstYearData = data[firstYear][firstYear]
-    const lastYearData = data[lastYear][lastYear]
-    
-    if (!firstYearData?.setores || !lastYearData?.setores) {
-      console.warn("Missing sector data for trend calculation")
-      return
-    }
+    // Sectors with a value in both years
+    Object.keys(series.setores).forEach(sectorName => {
+      const firstYearValue = sectorValue(sectorName, firstYear)
+      const lastYearValue = sectorValue(sectorName, lastYear)
+      if (firstYearValue === undefined || lastYearValue === undefined) return
+      
+      const diff = lastYearValue - firstYearValue
+      const percentChange = (diff / firstYearValue) * 100
+      
+      trends[sectorName] = {
+        trend: diff > 0 ? 'up' : diff < 0 ? 'down' : 'neutral',
+        percentage: Math.abs(percentChange)
+      }
+    })
     
-    // Process each sector in the first year
-    Object.entries(firstYearData.setores).forEach(([sectorName, sectorData]) => {
-      // Check if the sector exists in the last year
-      if (lastYearData.setores[sectorName]) {
-        const firstYearValue = sectorData.despesa_executada_efetiva_consolidada
-        const lastYearValue = lastYearData.setores[sectorName].despesa_executada_efetiva_consolidada
-        
-        const diff = lastYearValue - firstYearValue
-        const percentChange = (diff / firstYearValue) * 100
-        
-        trends[sectorName] = {
-          trend: diff > 0 ? 'up' : diff < 0 ? 'down' : 'neutral',
-          percentage: Math.abs(percentChange)
-        }
-        
-        // Calculate subsector (medidas) trends if they exist
-        if (sectorData.medidas && lastYearData.setores[sectorName].medidas) {
-          // Get all unique subsector names across both years
-          const allSubsectorNames = new Set<string>()
-          
-          Object.keys(sectorData.medidas).forEach(name => allSubsectorNames.add(name))
-          Object.keys(lastYearData.setores[sectorName].medidas).forEach(name => allSubsectorNames.add(name))
-          
-          // Calculate trends for each subsector that exists in both years
-          allSubsectorNames.forEach(subsectorName => {
-            if (sectorData.medidas[subsectorName] !== undefined && 
-                lastYearData.setores[sectorName].medidas[subsectorName] !== undefined) {
-              const firstYearSubValue = sectorData.medidas[subsectorName]
-              const lastYearSubValue = lastYearData.setores[sectorName].medidas[subsectorName]
-              
-              const subDiff = lastYearSubValue - firstYearSubValue
-              const subPercentChange = firstYearSubValue > 0 ? (subDiff / firstYearSubValue) * 100 : 0
-              
-              trends[subsectorName] = {
-                trend: subDiff > 0 ? 'up' : subDiff < 0 ? 'down' : 'neutral',
-                percentage: Math.abs(subPercentChange)
-              }
-            }
-          })
-        }
+    // Subsectors (medidas) with a value in both years
+    Object.keys(sectorSeries?.medidas ?? {}).forEach(subsectorName => {
+      const firstYearSubValue = medidaValue(subsectorName, firstYear)
+      const lastYearSubValue = medidaValue(subsectorName, lastYear)
+      if (firstYearSubValue === undefined || lastYearSubValue === undefined) return
+      
+      const subDiff = lastYearSubValue - firstYearSubValue
+      const subPercentChange = firstYearSubValue > 0 ? (subDiff / firstYearSubValue) * 100 : 0
+      
+      trends[subsectorName] = {
+        trend: subDiff > 0 ? 'up' : subDiff < 0 ? 'down' : 'neutral',
+        percentage: Math.abs(subPercentChange)
       }
     })
     
@@ -319,35 +245,11 @@ export function SectorTrends() {
     let color = ''
     trend.trend === 'up' ? color = 'text-green-600' : trend.trend === 'down' ? color = 'text-red-600' : color = 'text-gray-500'
     
-    // Calculate absolute change for sector or subsector
-    const firstYear = baseYear
-    const lastYear = endYear
-    let absoluteChange = 0
-    
-    if (firstYear !== lastYear && 
-        yearData[firstYear]?.[firstYear]?.setores && 
-        yearData[lastYear]?.[lastYear]?.setores) {
-        
-      // Check if name is a sector
-      if (yearData[firstYear][firstYear].setores[name] && yearData[lastYear][lastYear].setores[name]) {
-        const first = yearData[firstYear][firstYear].setores[name].despesa_executada_efetiva_consolidada
-        const last = yearData[lastYear][lastYear].setores[name].despesa_executada_efetiva_consolidada
-        absoluteChange = Math.abs(last - first)
-      } else {
-        // Check if name is a subsector/measure
-        for (const sector of Object.keys(yearData[firstYear][firstYear].setores)) {
-          const firstYearMedidas = yearData[firstYear][firstYear].setores[sector].medidas
-          const lastYearMedidas = yearData[lastYear][lastYear].setores[sector]?.medidas
-          
-          if (firstYearMedidas?.[name] !== undefined && lastYearMedidas?.[name] !== undefined) {
-            const first = firstYearMedidas[name]
-            const last = lastYearMedidas[name]
-            absoluteChange = Math.abs(last - first)
-            break
-          }
-        }
-      }
-    }
+    // Absolute change of the sector, or else of the subsector/measure
+    const value = series?.setores[name] ? sectorValue : medidaValue
+    const first = value(name, baseYear)
+    const last = value(name, endYear)
+    const absoluteChange = baseYear !== endYear && first !== undefined && last !== undefined ? Math.abs(last - first) : 0
     
     return (
       <div className={`text-xs text-muted-foreground mt-0.5 ${color}`}>
@@ -376,75 +278,57 @@ export function SectorTrends() {
     );
   }
   
-  // Update subsectors when sector changes
+  // Fetch the series of the selected sector's medidas when the sector changes
   useEffect(() => {
-    if (!selectedSector || !yearData || Object.keys(yearData).length === 0) {
-      setSubsectors([])
-      setSelectedSubsectors([])
-      setSubsectorsInAllYears(new Set())
-      setPartialSubsectors(new Set())
-      return
-    }
-    
-    // Find the selected sector in all years to identify subsectors
-    const subsectorsByYear = new Map<string, Set<string>>()
-    const allSubsectors = new Set<string>()
-    
-    // Gather subsectors by year for the selected sector
-    YEARS.forEach(year => {
-      const yearSubsectors = new Set<string>()
-      if (yearData[year]?.[year]?.setores?.[selectedSector]?.medidas) {
-        Object.keys(yearData[year][year].setores[selectedSector].medidas).forEach(subsectorName => {
-          yearSubsectors.add(subsectorName)
-          allSubsectors.add(subsectorName)
-        })
-      }
-      subsectorsByYear.set(year, yearSubsectors)
-    })
-    
-    // Determine which subsectors are in all years vs. partial years
-    const inAllYears = new Set<string>()
-    const inPartialYears = new Set<string>()
-    
-    allSubsectors.forEach(subsector => {
-      let inAll = true
-      for (const year of YEARS) {
-        if (!subsectorsByYear.get(year)?.has(subsector)) {
-          inAll = false
-          break
-        }
-      }
-      
-      if (inAll) {
-        inAllYears.add(subsector)
-      } else {
-        inPartialYears.add(subsector)
-      }
-    })
-    
-    setSubsectorsInAllYears(inAllYears)
-    setPartialSubsectors(inPartialYears)
+    setSectorSeries(null)
+    setSubsectors([])
+    setSelectedSubsectors([])
+    setSubsectorsInAllYears(new Set())
+    setPartialSubsectors(new Set())
     
-    // Use all subsectors as the initial list, sort them alphabetically
-    setSubsectors([...allSubsectors].sort())
+    const file = selectedSector ? series?.ficheiros[selectedSector] : undefined
+    if (!file) return
     
-    // Reset selected subsectors
-    setSelectedSubsectors([])
-  }, [selectedSector, yearData])
+    let cancelled = false
+    fetchData<SectorSeries>(`series/despesa/${file}`)
+      .then(data => {
+        if (cancelled) return
+        setSectorSeries(data)
+        
+        // Subsectors with a value in every year vs. only in some of them
+        const allSubsectors = Object.keys(data.medidas)
+        setSubsectorsInAllYears(new Set(allSubsectors.filter(subsector => inAllYears(data.medidas[subsector]))))
+        setPartialSubsectors(new Set(allSubsectors.filter(subsector => !inAllYears(data.medidas[subsector]))))
+        
+        // Use all subsectors as the initial list, sort them alphabetically
+        setSubsectors(allSubsectors.sort())
+      })
+      .catch(err => console.error("Error fetching sector data:", err))
+    return () => {
+      cancelled = true
+    }
+  }, [selectedSector, series])
   
-  // Prepare data for the chart with the new data structure
+  // Prepare data for the chart from the series
   const chartData = YEARS
     .filter(year => parseInt(year) >= parseInt(baseYear) && parseInt(year) <= parseInt(endYear))
     .map(year => {
-    const yearDataObj = yearData[year]
-    if (!yearDataObj?.[year]?.setores) return { year }
+    if (!series) return { year }
     
+    const totalBudget = yearTotal(year)
     // Start with the year as the base object
     const dataPoint: Record<string, any> = {
       year,
-      // Calculate total budget as a sum of all sector executions
-      Total: (Object.values(yearDataObj[year].setores).reduce((acc, sector) => 
-        acc + sector.despesa_executada_efetiva_consolidada, 0) / 1000).toFixed(2), // Convert to billions
+      Total: (totalBudget / 1000).toFixed(2), // Convert to billions
+    }
+    
+    // A sector in billions or as a percentage of the total budget; null (a gap in the line) for years it has no value
+    const sectorPoint = (sectorName: string) => {
+      const value = sectorValue(sectorName, year)
+      if (value === undefined) return null
+      return selectedType === 'absolute'
+        ? Number((value / 1000).toFixed(2))
+        : Number(((value / totalBudget) * 100).toFixed(2))
     }
     
     // If no sector is selected, show totals for all sectors
@@ -453,108 +337,36 @@ export function SectorTrends() {
       const sectorsToShow = showIncompleteData ? sectors : [...sectorsInAllYears];
       
       sectorsToShow.forEach(sectorName => {
-        const sectorData = yearDataObj[year]?.setores[sectorName]
-        
-        if (sectorData) {
-          if (selectedType === 'absolute') {
-            // Convert to billions and store as number for the graph
-            dataPoint[sectorName] = Number((sectorData.despesa_executada_efetiva_consolidada / 1000).toFixed(2))
-          } else {
-            // Calculate percentage of total budget
-            const totalBudget = Object.values(yearDataObj[year].setores).reduce((acc, sector) => 
-              acc + sector.despesa_executada_efetiva_consolidada, 0)
-            const percentage = (sectorData.despesa_executada_efetiva_consolidada / totalBudget) * 100
-            dataPoint[sectorName] = Number(percentage.toFixed(2)) // Store as number for the graph
-          }
-        } else {
-          // For sectors that don't exist in this year but are included due to showIncompleteData,
-          // use null to create a gap in the chart line
-          dataPoint[sectorName] = null;
-        }
+        dataPoint[sectorName] = sectorPoint(sectorName)
       })
     } 
     // If a sector is selected but no subsectors, show sector total
-    else if (selectedSector && selectedSubsectors.length === 0 && !showAllSubsectors) {
-      const sectorData = yearDataObj[year]?.setores[selectedSector]
-      
-      if (sectorData) {
-        if (selectedType === 'absolute') {
-          // Convert to billions and store as number for the graph
-          dataPoint[selectedSector] = Number((sectorData.despesa_executada_efetiva_consolidada / 1000).toFixed(2))
-        } else {
-          // Calculate percentage of total budget
-          const totalBudget = Object.values(yearDataObj[year].setores).reduce((acc, sector) => 
-            acc + sector.despesa_executada_efetiva_consolidada, 0)
-          const percentage = (sectorData.despesa_executada_efetiva_consolidada / totalBudget) * 100
-          dataPoint[selectedSector] = Number(percentage.toFixed(2)) // Store as number for the graph
-        }
-      } else {
-        // If sector doesn't exist in this year, use null for gap in chart
-        dataPoint[selectedSector] = null;
-      }
+    else if (selectedSubsectors.length === 0 && !showAllSubsectors) {
+      dataPoint[selectedSector] = sectorPoint(selectedSector)
     }
     // If showing all subsectors or specific subsectors
-    else if (selectedSector) {
-      const sectorData = yearDataObj[year]?.setores[selectedSector]
+    else {
+      dataPoint[selectedSector] = sectorPoint(selectedSector)
+      const sectorBudget = sectorValue(selectedSector, year)
+      
+      // Determine which subsectors to show based on settings
+      const subsectorsToShow = showAllSubsectors
+        ? (showIncompleteData ? subsectors : [...subsectorsInAllYears])
+        : selectedSubsectors
       
-      if (sectorData) {
-        // Add sector total
-        if (selectedType === 'absolute') {
+      subsectorsToShow.forEach(subName => {
+        const subsectorValue = medidaValue(subName, year)
+        if (subsectorValue === undefined || sectorBudget === undefined) {
+          // Subsectors (or a sector) without a value in this year leave a gap in the chart line
+          dataPoint[subName] = null;
+        } else if (selectedType === 'absolute') {
           // Convert to billions and store as number for the graph
-          dataPoint[selectedSector] = Number((sectorData.despesa_executada_efetiva_consolidada / 1000).toFixed(2))
-        } else {
-          // Calculate percentage of total budget
-          const totalBudget = Object.values(yearDataObj[year].setores).reduce((acc, sector) => 
-            acc + sector.despesa_executada_efetiva_consolidada, 0)
-          const percentage = (sectorData.despesa_executada_efetiva_consolidada / totalBudget) * 100
-          dataPoint[selectedSector] = Number(percentage.toFixed(2)) // Store as number for the graph
-        }
-        
-        // Add subsector (medidas) data if available
-        if (sectorData.medidas) {
-          // Determine which subsectors to show based on settings
-          let subsectorsToShow: string[] = [];
-          if (showAllSubsectors) {
-            subsectorsToShow = showIncompleteData 
-              ? Object.keys(sectorData.medidas) 
-              : [...subsectorsInAllYears];
-          } else {
-            subsectorsToShow = selectedSubsectors;
-          }
-          
-          subsectorsToShow.forEach(subName => {
-            const subsectorValue = sectorData.medidas?.[subName]
-            if (subsectorValue !== undefined) {
-              if (selectedType === 'absolute') {
-                // Convert to billions and store as number for the graph
-                dataPoint[subName] = Number((subsectorValue / 1000).toFixed(2))
-              } else {
-                // Calculate percentage of sector budget
-                const sectorBudget = sectorData.despesa_executada_efetiva_consolidada
-                const percentage = (subsectorValue / sectorBudget) * 100
-                dataPoint[subName] = Number(percentage.toFixed(2)) // Store as number for the graph
-              }
-            } else {
-              // For subsectors that don't exist in this year but are included due to showIncompleteData,
-              // use null to create a gap in the chart line
-              dataPoint[subName] = null;
-            }
-          })
-        }
-      } else {
-        // If sector doesn't exist in this year, set sector and all selected subsectors to null
-        dataPoint[selectedSector] = null;
-        
-        if (showAllSubsectors) {
-          subsectors.forEach(subName => {
-            dataPoint[subName] = null;
-          });
+          dataPoint[subName] = Number((subsectorValue / 1000).toFixed(2))
         } else {
-          selectedSubsectors.forEach(subName => {
-            dataPoint[subName] = null;
-          });
+          // Calculate percentage of sector budget
+          dataPoint[subName] = Number(((subsectorValue / sectorBudget) * 100).toFixed(2))
         }
-      }
+      })
     }
     
     return dataPoint
@@ -0,0 +1,28 @@
+// Content-hashed copies of the data files (public/data/hashed_outputs.py): data-manifest.json maps
+// "municipality_transfers/municipality/2023.json" to "municipality_transfers/municipality/2023.3f9a1c0b.json",
+// which next.config.mjs serves as immutable, so only the manifest is revalidated
+let manifestPromise: Promise<Record<string, string>> | null = null;
+
+function loadDataManifest(): Promise<Record<string, string>> {
+  if (!manifestPromise) {
+    manifestPromise = fetch("/data-manifest.json")
+      .then((response) => (response.ok ? response.json() : {}))
+      .catch(() => ({}));
+  }
+  return manifestPromise;
+}
+
+// URL of the hashed copy of a file under public/, or fallback when the manifest does not list it
+export async function dataUrl(file: string, fallback: string): Promise<string> {
+  const hashed = (await loadDataManifest())[file];
+  return hashed ? `/${hashed}` : fallback;
+}
+
+// Fetches a JSON file under public/ (its hashed copy when the manifest lists it)
+export async function fetchData<T>(file: string): Promise<T> {
+  const response = await fetch(await dataUrl(file, `/${file}`));
+  if (!response.ok) {
+    throw new Error(`Failed to load ${file}: ${response.status} ${response.statusText}`);
+  }
+  return response.json();
+}
@@ -27,6 +27,19 @@ const nextConfig = {
     parallelServerBuildTraces: true,
     parallelServerCompiles: true,
   },
+  // Content-hashed data files (public/data/hashed_outputs.py) never change; only the manifest does
+  async headers() {
+    return [
+      {
+        source: '/:path*/:file([^/]+\\.[0-9a-f]{8}\\.json)',
+        headers: [{ key: 'Cache-Control', value: 'public, max-age=31536000, immutable' }],
+      },
+      {
+        source: '/data-manifest.json',
+        headers: [{ key: 'Cache-Control', value: 'no-cache' }],
+      },
+    ]
+  },
 }
 
 if (userConfig) {
@@ -0,0 +1,312 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import hashed_outputs
+import series
+import store
+from build_manifest import MANIFEST_PATH, BuildManifest
+from pdf_mapas import find_pdf
+from perfil import DEFAULT_LOG_LEVEL, LOG_LEVELS, PERFIL, combine, configure_logging, format_stages, write_report
+from readers import DEFAULT_READER, READERS
+from saida import DEFAULT_EURO_DECIMALS, DEFAULT_PERCENT_DECIMALS
+from workbook import DATA_DIR, WorkbookSession, find_workbook
+
+
+# Que script extrai cada dataset, por intervalo de anos (anos posteriores usam o último)
+DATASETS = {
+    "despesa": ("Quadros", [
+        (2014, 2015, "script_efet_atual_2015"),
+        (2016, 2019, "script_efet_2019e2016"),
+        (2020, 2023, "script_efet_atual"),
+    ]),
+    "balanco": ("Quadros", [
+        (2013, 2021, "script_desp_others"),
+        (2022, 2023, "script_desp_22_23"),
+    ]),
+    "divida": ("Quadros", [
+        (2013, 2023, "script_divida"),
+    ]),
+    "municipality_transfers": ("Mapas", [
+        (2015, 2023, "script_mun"),
+    ]),
+}
+
+# Anos sem workbook mas com os Mapas em PDF (Mapas_pdf_YYYY.pdf)
+PDF_EXTRACTORS = {
+    "municipality_transfers": "script_mun_pdf",
+}
+
+# public/ tem os JSON publicados, alguns corrigidos à mão onde os extratores falham (ver bench.py):
+# por omissão as builds escrevem numa pasta à parte e só escrevem em public/ com --publish
+PUBLIC_DIR = os.path.dirname(DATA_DIR)
+DEFAULT_OUTPUT_DIR = os.path.join(DATA_DIR, "build")
+
+Job = namedtuple("Job", ["name", "func", "args", "deps"])
+
+
+def extractor_for(dataset, year):
+    """Script module that extracts `dataset` for `year`, or None before the first known layout."""
+    return module_for_year(DATASETS[dataset][1], year)
+
+
+def module_for_year(ranges, year):
+    """Module of the [(first year, last year, module)] range holding year; later years use the last one."""
+    for first, last, module in ranges:
+        if first <= year <= last:
+            return module
+    if year > ranges[-1][1]:
+        return ranges[-1][2]
+    return None
+
+
+def parse_years(text):
+    """"2013-2023" or "2015,2017,2020-2023" → sorted list of years."""
+    years = set()
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            years.update(range(int(first), int(last) + 1))
+        else:
+            years.add(int(part))
+    return sorted(years)
+
+
+# === Tarefas executadas nos processos do pool ===
+def _timed(func, *args):
+    inicio = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - inicio, result
+
+
+# As duas tarefas devolvem (ficheiros escritos, perfil do que fizeram, ver perfil.py); os processos
+# do pool são reaproveitados, por isso cada tarefa começa com o perfil a zeros
+def _warm_workbook(path, reader=None):
+    # Índice de títulos e lista de folhas ficam na cache antes de os extratores arrancarem
+    PERFIL.reset()
+    with WorkbookSession(path, reader=reader) as workbook:
+        workbook.index
+    return [], PERFIL.report()
+
+
+def _run_extractor(module_name, excel_path, year, output_path, verbose, leitura=None, saida=None):
+    PERFIL.reset()
+    module = importlib.import_module(module_name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        if excel_path.endswith(".pdf"):
+            written = module.processar_pdf(excel_path, year, output_path, saida=saida)
+        else:
+            written = module.processar_excel(excel_path, year, output_path, saida=saida, **(leitura or {}))
+    return written, PERFIL.report()
+
+
+# === Grafo de tarefas ===
+def build_jobs(years, datasets, output_dir=DEFAULT_OUTPUT_DIR, verbose=False, leitura=None, manifest=None, force=False,
+               saida=None):
+    """Ordered {name: Job}, the (dataset, year) pairs left out and the build plan.
+
+    Each extraction depends on the warm-up job of its workbook. leitura holds
+    WorkbookSession options for the extractors, saida their output options (see saida.py). With a BuildManifest, targets whose
+    inputs did not change are left out of the jobs (unless force); the plan maps every
+    target name to (output_path, fingerprint, reasons), reasons being empty when it is
+    up to date.
+    """
+    jobs = {}
+    missing = []
+    plan = {}
+    for year in years:
+        for dataset in datasets:
+            prefix = DATASETS[dataset][0]
+            module = extractor_for(dataset, year)
+            excel_path = find_workbook(prefix, year)
+            if excel_path is None and dataset in PDF_EXTRACTORS:
+                module, excel_path = PDF_EXTRACTORS[dataset], find_pdf(prefix, year)
+            if module is None or excel_path is None:
+                missing.append((dataset, year))
+                continue
+            output_path = os.path.join(output_dir, dataset, f"{year}.json")
+            name = f"{dataset}:{year}"
+            if manifest is not None:
+                fingerprint = manifest.fingerprint(module, excel_path, saida)
+                reasons = manifest.explain(output_path, fingerprint)
+                if force:
+                    reasons = reasons or ["--force"]
+                plan[name] = (output_path, fingerprint, reasons)
+                if not reasons:
+                    continue
+            args = (module, excel_path, year, output_path, verbose, leitura, saida)
+            if excel_path.endswith(".pdf"):
+                # O PDF não tem workbook para aquecer: o índice de páginas é feito pelo próprio extrator
+                jobs[name] = Job(name, _run_extractor, args, ())
+                continue
+            warm = f"workbook:{prefix}_{year}"
+            if warm not in jobs:
+                jobs[warm] = Job(warm, _warm_workbook, (excel_path, (leitura or {}).get("reader")), ())
+            jobs[name] = Job(name, _run_extractor, args, (warm,))
+    return jobs, missing, plan
+
+
+def is_curated(output_path, manifest=None):
+    """True for an existing output no recorded build produced (see BuildManifest.curated);
+    without a manifest, every existing output counts as curated."""
+    if manifest is None:
+        return os.path.exists(output_path)
+    return manifest.curated(output_path)
+
+
+def protect(jobs, manifest=None):
+    """Leaves out the extractions whose output is curated, and the warm-ups no extraction
+    needs any more; returns (jobs, names of the extractions left out)."""
+    curados = [name for name, job in jobs.items() if job.func is _run_extractor and is_curated(job.args[3], manifest)]
+    jobs = {name: job for name, job in jobs.items() if name not in curados}
+    needed = {dep for job in jobs.values() for dep in job.deps}
+    return {name: job for name, job in jobs.items() if job.func is not _warm_workbook or name in needed}, curados
+
+
+def run_jobs(jobs, workers=None):
+    """Runs the job graph on a process pool; returns {name: (status, seconds, result or error)}."""
+    pending = dict(jobs)
+    done, failed = set(), set()
+    results = {}
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        running = {}
+
+        def submit_ready():
+            for name, job in list(pending.items()):
+                if any(dep in failed for dep in job.deps):
+                    del pending[name]
+                    failed.add(name)
+                    results[name] = ("skipped", 0.0, "dependência falhou")
+                elif all(dep in done for dep in job.deps):
+                    del pending[name]
+                    running[pool.submit(_timed, job.func, *job.args)] = name
+
+        submit_ready()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    elapsed, result = future.result()
+                    results[name] = ("ok", elapsed, result)
+                    done.add(name)
+                except Exception as e:
+                    results[name] = ("failed", 0.0, e)
+                    failed.add(name)
+            submit_ready()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extrai vários anos e datasets em paralelo.")
+    parser.add_argument("--years", default="2013-2023", help='ex.: "2013-2023" ou "2015,2020-2023"')
+    parser.add_argument("--datasets", nargs="+", choices=sorted(DATASETS), default=list(DATASETS))
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help="pasta onde escrever despesa/, balanco/, ... (por omissão, public/data/build/)")
+    parser.add_argument("--publish", action="store_true",
+                        help="escreve em public/; os outputs curados, que nenhuma build registou, só são substituídos com --force")
+    parser.add_argument("--workers", type=int, default=None, help="processos (por omissão, um por core)")
+    parser.add_argument("--verbose", action="store_true", help="mostra o output dos scripts (o mesmo que --log-level DEBUG)")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=DEFAULT_LOG_LEVEL,
+                        help="a partir de que nível se mostram as mensagens dos scripts")
+    parser.add_argument("--profile", metavar="FICHEIRO", default=None,
+                        help="escreve um relatório JSON com o tempo de cada etapa, por tarefa e por folha")
+    parser.add_argument("--stream", action="store_true",
+                        help="lê os .xlsx linha a linha e pára no fim de cada bloco (menos memória)")
+    parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                        help="em streaming, falha se uma folha alocar mais do que isto")
+    parser.add_argument("--reader", choices=sorted(READERS), default=DEFAULT_READER,
+                        help="backend de leitura dos workbooks (calamine: mais rápido, precisa do python-calamine)")
+    parser.add_argument("--compact", action="store_true",
+                        help="JSON minificado e arredondado, com versões .gz/.br ao lado")
+    parser.add_argument("--euro-decimals", type=int, default=DEFAULT_EURO_DECIMALS,
+                        help="com --compact, casas decimais de um euro nos montantes (2 = cêntimos)")
+    parser.add_argument("--percent-decimals", type=int, default=DEFAULT_PERCENT_DECIMALS,
+                        help="com --compact, casas decimais das percentagens")
+    parser.add_argument("--no-compress", action="store_true", help="com --compact, não escreve .gz/.br")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="manifesto da build incremental")
+    parser.add_argument("--no-manifest", action="store_true", help="extrai tudo sem consultar nem atualizar o manifesto")
+    parser.add_argument("--force", action="store_true",
+                        help="reconstrói todos os outputs, mesmo os atualizados (e, em public/, os curados)")
+    parser.add_argument("--explain", action="store_true", help="mostra porque é que cada output é (ou não) reconstruído")
+    parser.add_argument("--series", action="store_true",
+                        help="no fim, reescreve as séries temporais de todos os anos em <output>/series/ (ver series.py)")
+    parser.add_argument("--hashed", action="store_true",
+                        help="no fim, escreve cópias com o hash do conteúdo no nome e o data-manifest.json (ver hashed_outputs.py)")
+    parser.add_argument("--export", action="store_true",
+                        help=f"no fim, junta todos os anos e datasets em {os.path.relpath(store.DEFAULT_STORE_DIR, DATA_DIR)}/ (ver store.py)")
+    args = parser.parse_args(argv)
+
+    configure_logging("DEBUG" if args.verbose else args.log_level)
+    leitura = {}
+    if args.stream:
+        leitura["stream"] = True
+    if args.memory_budget:
+        leitura["memory_budget"] = int(args.memory_budget * 2**20)
+    if args.reader != DEFAULT_READER:
+        leitura["reader"] = args.reader
+    inicio = time.perf_counter()
+    manifest = None if args.no_manifest else BuildManifest(args.manifest)
+    saida = None
+    if args.compact:
+        saida = {"compact": True, "euro_decimals": args.euro_decimals,
+                 "percent_decimals": args.percent_decimals, "compress": not args.no_compress}
+    output_dir = PUBLIC_DIR if args.publish else args.output_dir
+    jobs, missing, plan = build_jobs(parse_years(args.years), args.datasets, output_dir, args.verbose,
+                                     leitura, manifest, args.force, saida)
+    if os.path.isdir(output_dir) and os.path.samefile(output_dir, PUBLIC_DIR) and not args.force:
+        jobs, curados = protect(jobs, manifest)
+        for name in curados:
+            print(f"🔒 {name}: output curado em public/, não substituído (--force para substituir)")
+    for dataset in args.datasets:
+        anos = [str(year) for d, year in missing if d == dataset]
+        if anos:
+            print(f"– {dataset}: ignorado em {', '.join(anos)} (sem workbook ou sem extrator para o ano)")
+    atualizados = [name for name, (_, _, reasons) in plan.items() if not reasons]
+    if args.explain:
+        for name, (_, fingerprint, reasons) in plan.items():
+            motivo = "; ".join(reasons) if reasons else "atualizado"
+            print(f"{'↻' if reasons else '='} {name:<32} {fingerprint['extractor']:<24} {motivo}")
+    if atualizados:
+        print(f"= {len(atualizados)} output(s) atualizados, não reconstruídos ({time.perf_counter() - inicio:.3f}s a verificar)")
+
+    results = run_jobs(jobs, args.workers) if jobs else {}
+    for name in jobs:
+        status, elapsed, detail = results[name]
+        nota = "" if status == "ok" else f"{status}: {detail}"
+        print(f"{'✓' if status == 'ok' else '✗'} {name:<32} {elapsed:7.2f}s  {nota}")
+        if manifest is not None and status == "ok" and name in plan:
+            output_path, fingerprint, _ = plan[name]
+            # Todos os ficheiros que a tarefa escreveu (shards, vistas, .gz/.br)
+            written, _ = detail
+            manifest.record(output_path, fingerprint, written)
+    if manifest is not None:
+        manifest.save()
+    print(f"\n{len(jobs)} tarefas em {time.perf_counter() - inicio:.2f}s")
+    if args.profile:
+        perfis = {name: perfil for name, (status, _, (_, perfil)) in results.items() if status == "ok"}
+        report = combine(perfis, time.perf_counter() - inicio)
+        write_report(args.profile, report)
+        print(f"{format_stages(report)} → {args.profile}")
+    if args.series:
+        counts = series.write_series(output_dir, os.path.join(output_dir, "series"), saida)
+        print(f"📈 séries atualizadas: {sum(counts.values())} ficheiros")
+    if args.hashed:
+        counts = hashed_outputs.publish(output_dir)
+        print(f"🔒 {hashed_outputs.MANIFEST_NAME}: {counts['files']} ficheiros, {counts['written']} cópias novas")
+    if args.export:
+        counts = store.export(output_dir)
+        print(f"📦 store atualizada: {sum(counts.values())} linhas em {len(counts)} tabelas")
+    return 0 if all(status == "ok" for status, _, _ in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
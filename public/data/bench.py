@@ -0,0 +1,207 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import DATASETS, PDF_EXTRACTORS, PUBLIC_DIR, _run_extractor, build_jobs, extractor_for
+from perfil import peak_rss_bytes
+
+
+# Workbooks versionados no repositório (os restantes anos não estão no git)
+BENCH_YEARS = [2013, 2014, 2015, 2023]
+
+
+# === Uma etapa (dataset, ano) num processo novo ===
+def _run_stage(module_name, excel_path, year, output_path, leitura):
+    from workbook import read_counts
+
+    read_counts.clear()
+    inicio = time.perf_counter()
+    _, profile = _run_extractor(module_name, excel_path, year, output_path, False, leitura)
+    return {
+        "wall_seconds": time.perf_counter() - inicio,
+        "peak_rss": peak_rss_bytes(),
+        "workbook_opens": read_counts["opens"],
+        "sheets_decoded": read_counts["decoded"],
+        "sheets_cached": read_counts["cached"],
+        "profile": profile,
+    }
+
+
+def run_stage(module_name, excel_path, year, output_path, leitura):
+    # "spawn" para o pico de memória de cada etapa não herdar o do processo do benchmark
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_run_stage, module_name, excel_path, year, output_path, leitura).result()
+
+
+# === Comparação com os JSON de referência ===
+def _leaves(value, path=""):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _leaves(child, f"{path}/{key}")
+    elif isinstance(value, list):
+        for i, child in enumerate(value):
+            yield from _leaves(child, f"{path}/{i}")
+    else:
+        yield path, value
+
+
+def _same(a, b, rel_tol):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool) and not isinstance(b, bool):
+        if math.isnan(a) or math.isnan(b):
+            return math.isnan(a) and math.isnan(b)
+        return a == b if not rel_tol else math.isclose(a, b, rel_tol=rel_tol)
+    return a == b
+
+
+def diff_json(produced_path, golden_path, rel_tol=0.0, limit=3):
+    """Leaf-by-leaf comparison of two JSON files: counts plus the first differing paths."""
+    if not os.path.exists(golden_path):
+        return {"status": "no-golden"}
+    with open(produced_path, "rb") as f:
+        produced_bytes = f.read()
+    with open(golden_path, "rb") as f:
+        golden_bytes = f.read()
+    if produced_bytes == golden_bytes:
+        return {"status": "identical"}
+
+    produced = dict(_leaves(json.loads(produced_bytes)))
+    golden = dict(_leaves(json.loads(golden_bytes)))
+    common = produced.keys() & golden.keys()
+    changed = [path for path in produced if path in common and not _same(produced[path], golden[path], rel_tol)]
+    missing = [path for path in golden if path not in produced]
+    extra = [path for path in produced if path not in golden]
+    status = "equal" if not (changed or missing or extra) else "differs"
+    return {
+        "status": status,
+        "leaves": len(golden),
+        "equal": len(common) - len(changed),
+        "changed": len(changed),
+        "missing": len(missing),
+        "extra": len(extra),
+        "examples": [
+            *[f"≠ {path}: {produced[path]!r} vs {golden[path]!r}" for path in changed[:limit]],
+            *[f"- {path}" for path in missing[:limit]],
+            *[f"+ {path}" for path in extra[:limit]],
+        ],
+    }
+
+
+# === Benchmark ===
+def run_benchmark(years, datasets, golden_dir, output_dir, leitura=None, repeat=1, rel_tol=0.0):
+    """Runs every (dataset, year) extractor in its own process and diffs the result with golden_dir.
+
+    The targets are the extraction jobs batch.build_jobs plans (the PDF fallbacks
+    included). Returns one dict per stage; repeated runs keep the fastest wall time
+    and the largest peak RSS.
+    """
+    jobs, _, _ = build_jobs(years, datasets, output_dir, leitura=leitura or {})
+    stages = []
+    for year in years:
+        for dataset in datasets:
+            job = jobs.get(f"{dataset}:{year}")
+            if job is None:
+                module = extractor_for(dataset, year) or PDF_EXTRACTORS.get(dataset)
+                stage = {"dataset": dataset, "year": year, "extractor": module, "status": "skipped",
+                         "detail": "sem extrator para o ano" if module is None else f"sem {DATASETS[dataset][0]}_{year}"}
+                stages.append(stage)
+                continue
+
+            module, excel_path, _, output_path, _, job_leitura, _ = job.args
+            stage = {"dataset": dataset, "year": year, "extractor": module}
+            runs = []
+            try:
+                for _ in range(repeat):
+                    runs.append(run_stage(module, excel_path, year, output_path, job_leitura))
+            except Exception as e:
+                stage.update(status="failed", detail=f"{type(e).__name__}: {e}")
+                stages.append(stage)
+                continue
+
+            rss = [run["peak_rss"] for run in runs if run["peak_rss"] is not None]
+            stage.update(runs[0])
+            stage.update(
+                status="ok",
+                workbook=os.path.basename(excel_path),
+                wall_seconds=min(run["wall_seconds"] for run in runs),
+                peak_rss=max(rss) if rss else None,
+                output=output_path,
+                bytes_written=os.path.getsize(output_path),
+                golden=diff_json(output_path, os.path.join(golden_dir, dataset, f"{year}.json"), rel_tol),
+            )
+            stages.append(stage)
+    return stages
+
+
+def format_report(stages):
+    linhas = [f"{'etapa':<28} {'tempo':>8} {'pico RSS':>10} {'folhas':>7}  golden"]
+    for stage in stages:
+        name = f"{stage['dataset']}:{stage['year']}"
+        if stage["status"] != "ok":
+            linhas.append(f"{name:<28} {stage['status']}: {stage['detail']}")
+            continue
+        rss = f"{stage['peak_rss'] / 2**20:.0f} MB" if stage["peak_rss"] else "–"
+        golden = stage["golden"]
+        if golden["status"] == "differs":
+            resumo = (f"differs ({golden['equal']}/{golden['leaves']} iguais, {golden['changed']} alterados, "
+                      f"{golden['missing']} em falta, {golden['extra']} a mais)")
+        else:
+            resumo = golden["status"]
+        linhas.append(f"{name:<28} {stage['wall_seconds']:7.2f}s {rss:>10} {stage['sheets_decoded']:>7}  {resumo}")
+        linhas.extend(f"{'':<30}{example}" for example in golden.get("examples", []))
+    return "\n".join(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede os extratores nos workbooks versionados e compara com os JSON de referência.")
+    parser.add_argument("--years", nargs="+", type=int, default=BENCH_YEARS)
+    parser.add_argument("--datasets", nargs="+", choices=sorted(DATASETS), default=list(DATASETS))
+    parser.add_argument("--golden-dir", default=PUBLIC_DIR,
+                        help="pasta com despesa/, balanco/, ... de referência (por omissão, os JSON de public/)")
+    parser.add_argument("--output-dir", default=None, help="onde escrever o output (por omissão, uma pasta temporária)")
+    parser.add_argument("--save-golden", metavar="DIR", default=None,
+                        help="copia o output desta execução para DIR, para comparar execuções futuras com --golden-dir DIR")
+    parser.add_argument("--repeat", type=int, default=1, help="execuções por etapa (fica o tempo mais rápido)")
+    parser.add_argument("--rel-tol", type=float, default=0.0, help="tolerância relativa nos números (0 = iguais)")
+    parser.add_argument("--cache", action="store_true", help="usa a cache de folhas (por omissão, mede a frio)")
+    parser.add_argument("--stream", action="store_true", help="lê os .xlsx em streaming")
+    parser.add_argument("--report", default=None, help="escreve também o relatório em JSON neste ficheiro")
+    parser.add_argument("--check", action="store_true", help="termina com erro se algum output diferir da referência")
+    args = parser.parse_args(argv)
+
+    leitura = {"cache": args.cache}
+    if args.stream:
+        leitura["stream"] = True
+
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="bench-")
+    stages = run_benchmark(sorted(args.years), args.datasets, args.golden_dir, output_dir,
+                           leitura, max(args.repeat, 1), args.rel_tol)
+    print(format_report(stages))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"leitura": leitura, "golden_dir": args.golden_dir, "stages": stages}, f, ensure_ascii=False, indent=2)
+    if args.save_golden:
+        for stage in stages:
+            if stage["status"] == "ok":
+                destino = os.path.join(args.save_golden, stage["dataset"], f"{stage['year']}.json")
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                shutil.copyfile(stage["output"], destino)
+        print(f"\nreferência guardada em {args.save_golden}")
+    if not args.output_dir:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    failed = any(stage["status"] == "failed" for stage in stages)
+    differs = any(stage.get("golden", {}).get("status") == "differs" for stage in stages)
+    return 1 if failed or (args.check and differs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
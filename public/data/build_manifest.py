@@ -0,0 +1,158 @@
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+
+from pdf_mapas import page_index
+from sheet_cache import file_sha256
+from workbook import DATA_DIR, WorkbookSession
+
+
+MANIFEST_PATH = os.path.join(DATA_DIR, "build-manifest.json")
+
+# Módulos partilhados cujo código também conta como "versão" de cada extrator
+EXTRACTOR_DEPENDENCIES = ["workbook", "sheet_index", "extracao", "saida", "transferencias", "despesa_shards", "gadm_ids",
+                           "pdf_mapas", "layouts", "readers", "sheet_cache", "perfil", "hashed_outputs"]
+# Ficheiros de dados lidos pelos extratores (os GID do GADM que o script_mun junta a cada município)
+EXTRACTOR_DATA = [os.path.join(DATA_DIR, "gadm_ids.json")]
+
+
+def _sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def module_source_hash(module_name):
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or not spec.origin:
+        raise ImportError(f"módulo {module_name!r} não encontrado")
+    return file_sha256(spec.origin)
+
+
+def extractor_version(module_name):
+    """Hash of the extractor script plus the shared modules and data files it is built on."""
+    parts = [f"{name}:{module_source_hash(name)}" for name in [module_name, *EXTRACTOR_DEPENDENCIES]]
+    parts += [f"{os.path.basename(path)}:{file_sha256(path) if os.path.exists(path) else None}" for path in EXTRACTOR_DATA]
+    return _sha256_text("\n".join(parts))
+
+
+# === Manifesto de build ===
+class BuildManifest:
+    """Content-addressed record of how each output JSON was produced.
+
+    For every output it keeps the SHA-256 of the input workbook, of its sheet list,
+    of the extractor code and of every file the extraction wrote (the year JSON, its
+    .gz/.br, the despesa shards, the transfer views); an output is stale as soon as
+    any of those no longer matches or is missing. Workbook hashes are memoized by size and mtime,
+    so checking an unchanged tree does not read the workbooks again.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get("files", {})
+        self.outputs = data.get("outputs", {})
+        self._versions = {}
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(self.path)))
+
+    def _file_entry(self, path):
+        # Só volta a calcular o hash (e a lista de folhas) se o tamanho ou o mtime mudaram
+        stat = os.stat(path)
+        key = self._key(path)
+        entry = self.files.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        sha256 = file_sha256(path)
+        if entry and entry["sha256"] == sha256:
+            sheets = entry["sheets"]
+        elif path.endswith(".pdf"):
+            # Num PDF, o equivalente à lista de folhas é o índice de páginas dos Mapas
+            index = page_index(path)
+            sheets = _sha256_text("\n".join(f"{mapa}:{entry['pages'][0]}-{entry['pages'][-1]}" for mapa, entry in index.items()))
+        else:
+            with WorkbookSession(path) as workbook:
+                sheets = _sha256_text("\n".join(workbook.sheet_names))
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256, "sheets": sheets}
+        self.files[key] = entry
+        return entry
+
+    def fingerprint(self, module_name, excel_path, saida=None):
+        """What an output produced now by module_name from excel_path (with the saida
+        output options) would be built from."""
+        if module_name not in self._versions:
+            self._versions[module_name] = extractor_version(module_name)
+        entry = self._file_entry(excel_path)
+        return {
+            "workbook": entry["sha256"],
+            "sheets": entry["sheets"],
+            "extractor": module_name,
+            "extractor_version": self._versions[module_name],
+            "saida": json.dumps(saida or {}, sort_keys=True),
+        }
+
+    def explain(self, output_path, fingerprint):
+        """Reasons output_path has to be rebuilt; an empty list means it is up to date."""
+        recorded = self.outputs.get(self._key(output_path))
+        if recorded is None:
+            return ["sem registo no manifesto"]
+        if not os.path.exists(output_path):
+            return ["output em falta"]
+        reasons = []
+        if recorded["workbook"] != fingerprint["workbook"]:
+            reasons.append("workbook alterado")
+        if recorded["sheets"] != fingerprint["sheets"]:
+            reasons.append("lista de folhas alterada")
+        if recorded["extractor"] != fingerprint["extractor"]:
+            reasons.append(f"extrator mudou de {recorded['extractor']} para {fingerprint['extractor']}")
+        elif recorded["extractor_version"] != fingerprint["extractor_version"]:
+            reasons.append(f"código de {fingerprint['extractor']} (ou dos módulos partilhados) alterado")
+        if recorded.get("saida", "{}") != fingerprint["saida"]:
+            reasons.append("opções de saída alteradas")
+        if reasons:
+            return reasons
+        if "written" not in recorded:
+            return ["registo sem a lista de ficheiros escritos"]
+        base = os.path.dirname(os.path.abspath(self.path))
+        for key, sha256 in recorded["written"].items():
+            path = os.path.join(base, key)
+            if not os.path.exists(path):
+                reasons.append(f"{key} em falta")
+            elif file_sha256(path) != sha256:
+                reasons.append(f"{key} alterado desde a última build")
+        return reasons
+
+    def curated(self, output_path):
+        """True when output_path exists but no recorded build wrote it as it is now: the
+        committed site data (partly corrected by hand) or a file edited since the build."""
+        if not os.path.exists(output_path):
+            return False
+        recorded = self.outputs.get(self._key(output_path))
+        return recorded is None or recorded.get("output") != file_sha256(output_path)
+
+    def record(self, output_path, fingerprint, written=()):
+        """Records output_path and every other file its extraction wrote (the paths
+        processar_excel / processar_pdf return)."""
+        paths = dict.fromkeys([os.path.abspath(output_path), *map(os.path.abspath, written)])
+        self.outputs[self._key(output_path)] = {
+            **fingerprint,
+            "output": file_sha256(output_path),
+            "written": {self._key(path): file_sha256(path) for path in paths if os.path.exists(path)},
+        }
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        payload = json.dumps({"files": self.files, "outputs": self.outputs}, ensure_ascii=False, indent=2, sort_keys=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,87 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import unicodedata
+
+from hashed_outputs import is_hashed
+from saida import escrever_json
+from workbook import DATA_DIR
+
+
+DEFAULT_DESPESA_DIR = os.path.join(os.path.dirname(DATA_DIR), "despesa")
+INDEX_NAME = "index.json"
+
+# Totais do ano que vão para o índice (e para cada setor na lista de setores)
+TOTAIS = ("despesa_orcamentada", "despesa_executada_efetiva_consolidada", "grau_execução")
+
+
+def slug(text):
+    """File-name-safe form of a sector name: "Ciência, Tecnologia e Ensino Superior" → "ciencia-tecnologia-e-ensino-superior"."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^0-9a-z]+", "-", text).strip("-") or "setor"
+
+
+# === Índice por ano e um ficheiro por setor ===
+def shards(output):
+    """(index, {file name: shard}) for one year's despesa output {year: {..., "setores": {...}}}.
+
+    Each shard is exactly the /api/despesa?sector= response, {year: {"sector": name, ...}}.
+    """
+    (ano, dados), = output.items()
+    index = {key: dados[key] for key in TOTAIS if key in dados}
+    index["setores"] = []
+    ficheiros = {}
+    for sector, valores in dados["setores"].items():
+        nome = slug(sector)
+        n = 2
+        while f"{nome}.json" in ficheiros:
+            nome, n = f"{slug(sector)}-{n}", n + 1
+        ficheiros[f"{nome}.json"] = {ano: {"sector": sector, **valores}}
+        index["setores"].append({
+            "sector": sector,
+            "shard": f"{nome}.json",
+            **{key: valores[key] for key in TOTAIS if key in valores},
+        })
+    return {ano: index}, ficheiros
+
+
+def write_shards(output, path_output, saida=None):
+    """Writes <dir>/<year>/index.json and one <dir>/<year>/<sector>.json per sector next to path_output;
+    returns every path written."""
+    folder = os.path.join(os.path.dirname(path_output), os.path.splitext(os.path.basename(path_output))[0])
+    index, ficheiros = shards(output)
+    os.makedirs(folder, exist_ok=True)
+    # Setores que deixaram de existir não ficam com ficheiros antigos
+    # (as cópias com hash são limpas por hashed_outputs.publish, que sabe quais ainda são precisas)
+    for antigo in glob.glob(os.path.join(folder, "*.json*")):
+        nome = re.sub(r"\.(gz|br)$", "", os.path.basename(antigo))
+        if nome not in ficheiros and nome != INDEX_NAME and not is_hashed(nome):
+            os.unlink(antigo)
+    written = []
+    for nome, shard in ficheiros.items():
+        written += escrever_json(shard, os.path.join(folder, nome), "despesa", saida, ensure_ascii=False, separators=(",", ":"))
+    written += escrever_json(index, os.path.join(folder, INDEX_NAME), "despesa", saida, ensure_ascii=False, separators=(",", ":"))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenera o índice e os ficheiros por setor a partir de despesa/YYYY.json.")
+    parser.add_argument("--dir", default=DEFAULT_DESPESA_DIR)
+    args = parser.parse_args(argv)
+
+    for path in sorted(glob.glob(os.path.join(args.dir, "*.json"))):
+        if not os.path.splitext(os.path.basename(path))[0].isdigit():
+            continue
+        with open(path, encoding="utf-8") as f:
+            output = json.load(f)
+        write_shards(output, path)
+        print(f"✓ {os.path.relpath(os.path.splitext(path)[0], args.dir)}/ ({len(output[next(iter(output))]['setores'])} setores)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from perfil import PERFIL
+
+
+# Linhas que delimitam o bloco de medidas nos quadros azuis
+INICIO_MEDIDAS = "Estado, SFA e EPR"
+FIM_MEDIDAS = "DESPESA TOTAL CONSOLIDADA"
+
+# Separador usado para tratar uma coluna de textos como uma só string
+SEP = "\x00"
+# Espaços normais, não separáveis e finos dentro dos números ("1 234,5", "1\u2009234,5")
+ESPACOS = re.compile(r"[^\S\x00]|[\u00a0\u2009\u202f]")
+# Número com os milhares separados por pontos, à portuguesa ("1.234.567" ou "1.234,5")
+MILHARES_PT = r"-?\d{1,3}(?:\.\d{3})+(?:,\d*)?"
+# Um texto com um ponto que não separa milhares ("259.1"): o ponto é a marca decimal
+PONTO_DECIMAL = re.compile(rf"(?:^|(?<=\x00))(?!{MILHARES_PT}(?:\x00|$))[^\x00]*\.")
+# Um texto que não é um número ("-", "", "n.d.")
+NAO_NUMERO = re.compile(r"(?:^|(?<=\x00))(?![+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?(?:\x00|$))[^\x00]*")
+
+
+def textos_coluna(df, coluna):
+    """Column as a stripped text array, with empty cells as "nan" (what str(cell).strip() gives)."""
+    valores = df.iloc[:, coluna].to_numpy(dtype=object)
+    return np.char.strip(np.where(pd.isna(valores), "nan", valores).astype(str))
+
+
+# === Procura vetorizada do bloco de medidas ===
+@PERFIL.timed("scan")
+def bloco_medidas(df, coluna_nome=1, coluna_valor=3, inicio=INICIO_MEDIDAS, fim=FIM_MEDIDAS):
+    """Names and raw values of the rows between the `inicio` and `fim` marker rows, without sub-totals.
+
+    The 2015-style quadros keep the names in column 0 (values in column 2), the others in
+    column 1 (values in column 3). Returns two equal-length lists; both are empty when the
+    start marker is missing, and the block runs to the end of the sheet if `fim` never appears.
+    """
+    nomes = textos_coluna(df, coluna_nome)
+    PERFIL.count("rows_scanned", len(nomes))
+    inicios = np.flatnonzero(np.char.find(nomes, inicio) >= 0)
+    if not len(inicios):
+        return [], []
+    primeira = inicios[0] + 1
+    fins = np.flatnonzero(np.char.find(np.char.upper(nomes[primeira:]), fim) >= 0)
+    ultima = primeira + fins[0] if len(fins) else len(nomes)
+
+    bloco = nomes[primeira:ultima]
+    manter = np.char.lower(bloco) != "sub-total"
+    valores = df.iloc[primeira:ultima, coluna_valor].to_numpy(dtype=object)
+    return bloco[manter].tolist(), valores[manter].tolist()
+
+
+# === Conversão vetorizada de números (pt-PT) ===
+@PERFIL.timed("clean")
+def numeros_pt(valores, vazio=0.0):
+    """float64 array of a column of mixed str/number/empty cells.
+
+    Numeric cells go through unchanged, so read the sheet without dtype=str: a float
+    such as 0.125 turned into the text "0.125" would read as 125 below.
+    The text cells are joined and cleaned as one string: spaces (normal, no-break and
+    thin) are dropped and the convention is decided for the whole column. With a comma
+    in any of them, or with every dot grouping thousands ("1.234.567"), dots are
+    thousands separators and the comma the decimal mark; otherwise the dot is the
+    decimal mark (what str() of a float gives). Cells that are not numbers give 0.0
+    and empty cells give `vazio`.
+    """
+    valores = np.asarray(valores, dtype=object)
+    PERFIL.count("cells_cleaned", len(valores))
+    e_texto = np.fromiter((type(valor) is str for valor in valores), dtype=bool, count=len(valores))
+    resultado = np.zeros(len(valores))
+
+    outros = valores[~e_texto]
+    try:
+        numeros = outros.astype(float)
+    except (TypeError, ValueError):
+        numeros = np.array(pd.to_numeric(pd.Series(outros, dtype=object), errors="coerce"), dtype=float)
+    numeros[pd.isna(outros)] = vazio
+    resultado[~e_texto] = numeros
+
+    if e_texto.any():
+        texto = SEP.join(valores[e_texto])
+        if ESPACOS.search(texto):
+            texto = ESPACOS.sub("", texto)
+        if "," in texto or ("." in texto and not PONTO_DECIMAL.search(texto)):
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            resultado[e_texto] = np.array(texto.split(SEP), dtype=object).astype(float)
+        except ValueError:
+            resultado[e_texto] = np.array(NAO_NUMERO.sub("0", texto).split(SEP), dtype=object).astype(float)
+
+    # "nan" escrito como texto, ou objetos que não são números, contam como 0.0
+    return np.where(np.isnan(resultado) & ~pd.isna(valores), 0.0, resultado)
@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+from collections import Counter
+
+import hashed_outputs
+from batch import DATASETS, DEFAULT_OUTPUT_DIR, PDF_EXTRACTORS, PUBLIC_DIR, is_curated, module_for_year
+from build_manifest import MANIFEST_PATH, BuildManifest
+from pdf_mapas import find_pdf
+from perfil import DEFAULT_LOG_LEVEL, LOG_LEVELS, PERFIL, configure_logging, format_stages, write_report
+from readers import DEFAULT_READER, READERS
+from workbook import WorkbookSession, find_workbook, read_counts
+
+
+# === Plugins: um por dataset extraído dos workbooks do ano ===
+class DatasetExtractor:
+    """A dataset written by the fused extraction from the prefix_YYYY workbook.
+
+    modules are [(first year, last year, script module)] as in batch.DATASETS; each
+    script has processar_excel(excel_path, year, output_path, saida=None, workbook=None)
+    and reads its quadros from the session it is given. pdf_module, as in
+    batch.PDF_EXTRACTORS, extracts the years only published as prefix_pdf_YYYY.pdf with
+    its processar_pdf(). Both return the paths written. A new dataset registers an
+    instance (or a subclass with its own extract()) through register().
+    """
+
+    def __init__(self, dataset, modules, prefix="Quadros", pdf_module=None):
+        self.dataset = dataset
+        self.modules = modules
+        self.prefix = prefix
+        self.pdf_module = pdf_module
+
+    def module_for(self, year):
+        return module_for_year(self.modules, year)
+
+    def extract(self, workbook, year, output_path, saida=None):
+        module = importlib.import_module(self.module_for(year))
+        return module.processar_excel(workbook.path, year, output_path, saida=saida, workbook=workbook)
+
+    def extract_pdf(self, pdf_path, year, output_path, saida=None):
+        module = importlib.import_module(self.pdf_module)
+        return module.processar_pdf(pdf_path, year, output_path, saida=saida)
+
+
+EXTRACTORS = {}
+
+
+def register(extractor):
+    """Adds a DatasetExtractor to the fused extraction (replacing the one of the same dataset)."""
+    EXTRACTORS[extractor.dataset] = extractor
+    return extractor
+
+
+for _dataset, (_prefix, _modules) in DATASETS.items():
+    register(DatasetExtractor(_dataset, _modules, _prefix, PDF_EXTRACTORS.get(_dataset)))
+
+
+# === Extração de um ano numa só passagem ===
+def extrair_ano(year, datasets=None, output_dir=DEFAULT_OUTPUT_DIR, verbose=False, saida=None, manifest=None,
+                protect=False, **leitura):
+    """Writes every registered dataset (or only `datasets`) for year, opening each workbook once.
+
+    The extractors of a workbook share one WorkbookSession: the file is decoded once
+    and each quadro is read from it (or from the SheetCache) by every extractor that
+    asks for it. Without the workbook, the extractors that have a pdf_module read the
+    year's PDF instead, as batch.py does. leitura holds WorkbookSession options and saida
+    the output options (see saida.py); with a BuildManifest the outputs are recorded as
+    batch.py would. With protect, curated outputs (see batch.is_curated) are left as they are.
+    Returns {dataset: (status, seconds, output path or error)}.
+    """
+    extractors = [EXTRACTORS[dataset] for dataset in (datasets or EXTRACTORS)]
+    results = {}
+
+    def extrair(extractor, module, source_path, extract):
+        output_path = os.path.join(output_dir, extractor.dataset, f"{year}.json")
+        if protect and is_curated(output_path, manifest):
+            results[extractor.dataset] = ("skipped", 0.0, "output curado em public/ (--force para substituir)")
+            return
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        inicio = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+                escritos = extract(output_path)
+        except Exception as e:
+            results[extractor.dataset] = ("failed", time.perf_counter() - inicio, e)
+            return
+        results[extractor.dataset] = ("ok", time.perf_counter() - inicio, output_path)
+        if manifest is not None:
+            manifest.record(output_path, manifest.fingerprint(module, source_path, saida), escritos)
+
+    for prefix in dict.fromkeys(extractor.prefix for extractor in extractors):
+        grupo = [extractor for extractor in extractors if extractor.prefix == prefix]
+        excel_path = find_workbook(prefix, year)
+        if excel_path is None:
+            # Anos só publicados em PDF (Mapas_pdf_YYYY.pdf): cada extrator com pdf_module lê o PDF
+            pdf_path = find_pdf(prefix, year)
+            for extractor in grupo:
+                if pdf_path is None or extractor.pdf_module is None:
+                    results[extractor.dataset] = ("skipped", 0.0, f"sem {prefix}_{year}")
+                    continue
+                extrair(extractor, extractor.pdf_module, pdf_path,
+                        lambda output_path: extractor.extract_pdf(pdf_path, year, output_path, saida))
+            continue
+        with WorkbookSession(excel_path, **leitura) as workbook:
+            for extractor in grupo:
+                module = extractor.module_for(year)
+                if module is None:
+                    results[extractor.dataset] = ("skipped", 0.0, "sem extrator para o ano")
+                    continue
+                extrair(extractor, module, excel_path,
+                        lambda output_path: extractor.extract(workbook, year, output_path, saida))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extrai todos os datasets de um ano abrindo cada workbook (Quadros_YYYY, Mapas_YYYY) uma só vez.")
+    parser.add_argument("year", type=int)
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULO",
+                        help="módulo que regista mais datasets com extrair_ano.register() (pode repetir-se)")
+    parser.add_argument("--datasets", nargs="+", default=None, help="por omissão, todos os registados")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help="pasta onde escrever despesa/, balanco/, ... (por omissão, public/data/build/)")
+    parser.add_argument("--publish", action="store_true",
+                        help="escreve em public/; os outputs curados, que nenhuma build registou, só são substituídos com --force")
+    parser.add_argument("--force", action="store_true", help="com --publish, substitui também os outputs curados")
+    parser.add_argument("--verbose", action="store_true", help="mostra o output dos scripts (o mesmo que --log-level DEBUG)")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=DEFAULT_LOG_LEVEL,
+                        help="a partir de que nível se mostram as mensagens dos scripts")
+    parser.add_argument("--profile", metavar="FICHEIRO", default=None,
+                        help="escreve um relatório JSON com o tempo de cada etapa e de cada folha")
+    parser.add_argument("--stream", action="store_true",
+                        help="lê os .xlsx linha a linha e pára no fim de cada bloco (menos memória)")
+    parser.add_argument("--reader", choices=sorted(READERS), default=DEFAULT_READER,
+                        help="backend de leitura dos workbooks (calamine: mais rápido, precisa do python-calamine)")
+    parser.add_argument("--hashed", action="store_true",
+                        help="no fim, escreve cópias com o hash do conteúdo no nome e o data-manifest.json (ver hashed_outputs.py)")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="manifesto da build incremental")
+    parser.add_argument("--no-manifest", action="store_true", help="não atualiza o manifesto")
+    args = parser.parse_args(argv)
+
+    for plugin in args.plugin:
+        importlib.import_module(plugin)
+    desconhecidos = sorted(set(args.datasets or []) - set(EXTRACTORS))
+    if desconhecidos:
+        parser.error(f"datasets sem extrator registado: {', '.join(desconhecidos)}")
+
+    configure_logging("DEBUG" if args.verbose else args.log_level)
+    PERFIL.reset()
+    inicio = time.perf_counter()
+    antes = Counter(read_counts)
+    manifest = None if args.no_manifest else BuildManifest(args.manifest)
+    leitura = {"stream": True} if args.stream else {}
+    if args.reader != DEFAULT_READER:
+        leitura["reader"] = args.reader
+    output_dir = PUBLIC_DIR if args.publish else args.output_dir
+    protect = os.path.isdir(output_dir) and os.path.samefile(output_dir, PUBLIC_DIR) and not args.force
+    results = extrair_ano(args.year, args.datasets, output_dir, args.verbose, manifest=manifest, protect=protect,
+                          **leitura)
+    if manifest is not None:
+        manifest.save()
+    for dataset, (status, elapsed, detail) in results.items():
+        nota = "" if status == "ok" else f"{status}: {detail}"
+        print(f"{'✓' if status == 'ok' else '–' if status == 'skipped' else '✗'} {f'{dataset}:{args.year}':<32} {elapsed:7.2f}s  {nota}")
+    contagem = read_counts - antes
+    print(f"\n{contagem['opens']} workbook(s) aberto(s), {contagem['decoded']} quadros descodificados, "
+          f"{contagem['cached']} da cache, em {time.perf_counter() - inicio:.2f}s")
+    if args.hashed:
+        counts = hashed_outputs.publish(output_dir)
+        print(f"🔒 {hashed_outputs.MANIFEST_NAME}: {counts['files']} ficheiros, {counts['written']} cópias novas")
+    if args.profile:
+        report = PERFIL.report()
+        write_report(args.profile, report)
+        print(f"{format_stages(report)} → {args.profile}")
+    return 0 if all(status != "failed" for status, _, _ in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+from saida import escrever_json
+from sheet_index import normalize_title
+from workbook import DATA_DIR
+
+
+PUBLIC_DIR = os.path.dirname(DATA_DIR)
+INDEX_PATH = os.path.join(DATA_DIR, "gadm_ids.json")
+GADM_FILES = {1: "gadm41_PRT_1.json", 2: "gadm41_PRT_2.json"}
+DEFAULT_TRANSFERS_DIR = os.path.join(PUBLIC_DIR, "municipality_transfers")
+
+# Nomes que a normalização não resolve sozinha: no GADM há duas Calhetas e duas Lagoas,
+# que o Mapa XIX distingue com a ilha ou a região entre parênteses, e o PDF de 2014 usa
+# o nome antigo da Praia da Vitória
+OVERRIDES = {
+    "calhetasaojorge": "PRT.2.2_1",
+    "calhetamadeira": "PRT.13.1_1",
+    "lagoasaomiguel": "PRT.2.5_1",
+    "lagoaacores": "PRT.2.5_1",
+    "lagoaalgarve": "PRT.9.6_1",
+    "viladapraiadavitoria": "PRT.2.12_1",
+}
+
+
+def chave(nome):
+    """Join key of a district or municipality name: "CASTELO DE PAIVA" and GADM's "CastelodePaiva"
+    both give "castelodepaiva"; "LAGOA (SÃO MIGUEL)" gives "lagoasaomiguel"."""
+    return normalize_title(nome).replace(" ", "")
+
+
+# === Índice de normalização (pré-calculado a partir dos ficheiros GADM) ===
+def build_index(public_dir=PUBLIC_DIR):
+    """{"districts": {key: GID_1}, "municipalities": {"district key/municipality key": GID_2},
+    "names": {GID: GADM name}} from the GADM GeoJSON files."""
+    index = {"districts": {}, "municipalities": {}, "names": {}}
+    for level, ficheiro in GADM_FILES.items():
+        with open(os.path.join(public_dir, ficheiro), encoding="utf-8") as f:
+            features = json.load(f)["features"]
+        for feature in features:
+            props = feature["properties"]
+            gid = props[f"GID_{level}"]
+            if level == 1:
+                index["districts"][chave(props["NAME_1"])] = gid
+            else:
+                index["municipalities"][f"{chave(props['NAME_1'])}/{chave(props['NAME_2'])}"] = gid
+            index["names"][gid] = props[f"NAME_{level}"]
+    return index
+
+
+class GidIndex:
+    """Resolves transfer district/municipality names to GADM GIDs; names it cannot
+    resolve are collected in unmatched as (district, municipality or None)."""
+
+    def __init__(self, index):
+        self.index = index
+        self.unmatched = []
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        if not os.path.exists(path):
+            return cls(build_index())
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def district(self, nome):
+        gid = self.index["districts"].get(chave(nome))
+        if gid is None:
+            self.unmatched.append((nome, None))
+        return gid
+
+    def municipality(self, district, nome):
+        gid = OVERRIDES.get(chave(nome))
+        if gid is None:
+            gid = self.index["municipalities"].get(f"{chave(district)}/{chave(nome)}")
+        if gid is None:
+            self.unmatched.append((district, nome))
+        return gid
+
+    def name(self, gid):
+        return self.index["names"].get(gid)
+
+
+def anotar(data, ids):
+    """Copy of a municipality_transfers year with the GADM GID of every district ("GID")
+    and of every municipality ("MunicipalityIds" {name: GID_2}); null where unmatched."""
+    districts = []
+    for district in data["Districts"]:
+        resto = {k: v for k, v in district.items() if k not in ("District", "GID", "MunicipalityIds")}
+        districts.append({
+            "District": district["District"],
+            "GID": ids.district(district["District"]),
+            **resto,
+            "MunicipalityIds": {nome: ids.municipality(district["District"], nome) for nome in district["Municipalities"]},
+        })
+    return {**data, "Districts": districts}
+
+
+def report_unmatched(ids):
+    for district, municipality in ids.unmatched:
+        nome = f"{municipality} ({district})" if municipality else district
+        print(f"⚠️ sem GID do GADM: {nome}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o índice nome → GID do GADM e anota as transferências já extraídas.")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--transfers-dir", default=DEFAULT_TRANSFERS_DIR)
+    parser.add_argument("--no-annotate", action="store_true", help="só gera o índice")
+    args = parser.parse_args(argv)
+
+    index = build_index()
+    with open(args.index, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"✓ {os.path.basename(args.index)}: {len(index['districts'])} distritos, {len(index['municipalities'])} municípios")
+    if args.no_annotate:
+        return 0
+
+    ids = GidIndex(index)
+    for path in sorted(glob.glob(os.path.join(args.transfers_dir, "*.json"))):
+        if not os.path.splitext(os.path.basename(path))[0].isdigit():
+            continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        antes = len(ids.unmatched)
+        escrever_json(anotar(data, ids), path, "municipality_transfers", ensure_ascii=False, indent=2)
+        print(f"✓ {os.path.basename(path)} ({len(ids.unmatched) - antes} nomes sem GID)")
+    report_unmatched(ids)
+    return 1 if ids.unmatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+
+from workbook import DATA_DIR
+
+
+DEFAULT_OUTPUT_DIR = os.path.dirname(DATA_DIR)
+MANIFEST_NAME = "data-manifest.json"
+# Pastas de public/ escritas pelos extratores (e pelas séries)
+OUTPUT_FOLDERS = ("despesa", "balanco", "divida", "municipality_transfers", "series")
+# Dígitos hexadecimais do sha256 no nome (2023.3f9a1c0b.json)
+HASH_LENGTH = 8
+
+_HASHED = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.json(?:\.gz|\.br)?$")
+
+
+def is_hashed(name):
+    """True for a content-hashed copy (2023.3f9a1c0b.json, or its .gz/.br)."""
+    return bool(_HASHED.search(name))
+
+
+def hashed_name(name, payload):
+    """2023.json → 2023.<first HASH_LENGTH hex digits of the sha256 of payload>.json."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def _write_atomic(path, payload):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_manifest(output_dir=DEFAULT_OUTPUT_DIR):
+    """{logical name: hashed name} of output_dir/data-manifest.json ({} when there is none)."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _outputs(output_dir, folders):
+    # Caminhos relativos a output_dir, com "/" como nos URLs
+    for folder in folders:
+        for root, dirs, files in os.walk(os.path.join(output_dir, folder)):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.endswith(".json") and not name.startswith(".") and not is_hashed(name):
+                    yield os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, "/")
+
+
+# === Cópias com o hash do conteúdo no nome + data-manifest.json ===
+def publish(output_dir=DEFAULT_OUTPUT_DIR, folders=OUTPUT_FOLDERS):
+    """Writes a content-hashed copy of every output JSON next to it, plus output_dir/data-manifest.json.
+
+    despesa/2023.json gets despesa/2023.3f9a1c0b.json (and the .gz/.br siblings
+    when they exist); the manifest maps "despesa/2023.json" to that name. A hashed
+    file never changes once written, so it can be served as immutable and only the
+    manifest needs revalidating. The fixed-name files stay, for the API routes.
+    Hashed files that are neither in the new manifest nor in the previous one are
+    removed: a client still holding the previous manifest keeps finding its files.
+    Returns {"files", "written", "removed"}.
+    """
+    anterior = load_manifest(output_dir)
+    manifest = {}
+    escritos = 0
+    for logical in _outputs(output_dir, folders):
+        path = os.path.join(output_dir, logical)
+        with open(path, "rb") as f:
+            payload = f.read()
+        hashed = hashed_name(logical, payload)
+        destino = os.path.join(output_dir, hashed)
+        if not os.path.exists(destino):
+            # As versões comprimidas primeiro: quando o .json existe, a cópia está completa
+            for sufixo in (".gz", ".br"):
+                if os.path.exists(path + sufixo):
+                    with open(path + sufixo, "rb") as f:
+                        _write_atomic(destino + sufixo, f.read())
+            _write_atomic(destino, payload)
+            escritos += 1
+        manifest[logical] = hashed
+
+    manter = set(manifest.values()) | set(anterior.values())
+    removidos = 0
+    for folder in folders:
+        for root, _, files in os.walk(os.path.join(output_dir, folder)):
+            for name in files:
+                relativo = os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, "/")
+                if is_hashed(name) and re.sub(r"\.(gz|br)$", "", relativo) not in manter:
+                    os.unlink(os.path.join(root, name))
+                    removidos += 1
+
+    # O manifesto é escrito no fim, quando todos os ficheiros para que aponta já existem
+    _write_atomic(os.path.join(output_dir, MANIFEST_NAME),
+                  json.dumps(manifest, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return {"files": len(manifest), "written": escritos, "removed": removidos}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Escreve cópias dos outputs com o hash do conteúdo no nome e o data-manifest.json que as indica.")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="pasta com despesa/, balanco/, ...")
+    args = parser.parse_args(argv)
+
+    counts = publish(args.output_dir)
+    print(f"🔒 {MANIFEST_NAME}: {counts['files']} ficheiros, {counts['written']} cópias novas, "
+          f"{counts['removed']} antigas removidas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
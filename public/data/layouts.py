@@ -0,0 +1,78 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Janela de um quadro que um extrator lê: linhas de dados depois do cabeçalho
+# (None = até ao fim da folha) e posições das colunas usadas
+Layout = namedtuple("Layout", ["nrows", "usecols"])
+
+# Por extrator e por tipo de quadro (ver sheet_index.QUADROS): [(primeiro ano, último ano, Layout)].
+# As posições (por ordem crescente) são as que os scripts usam com iloc; um último ano None vale para os anos seguintes.
+LAYOUTS = {
+    "script_efet_atual": {
+        # Programas nas linhas 3-22, total na linha 23; nome, orçamentado, executado e grau de execução
+        "despesa_por_programa": [(2020, None, Layout(24, (1, 4, 7, 8)))],
+        "medidas_programa": [(2020, None, Layout(None, (1, 3)))],
+    },
+    "script_efet_2019e2016": {
+        "despesa_por_programa": [(2016, 2019, Layout(24, (1, 4, 7, 8)))],
+        "medidas_programa": [(2016, 2019, Layout(None, (1, 3)))],
+    },
+    "script_efet_atual_2015": {
+        # Total na linha 19 e tudo uma coluna mais à esquerda
+        "despesa_por_programa": [(2014, 2015, Layout(20, (0, 3, 6, 7)))],
+        "medidas_programa": [(2014, 2015, Layout(None, (0, 2)))],
+    },
+    "script_desp_others": {
+        "conta_ap_contas_nacionais": [(2013, 2021, Layout(30, (0, 4)))],
+    },
+    "script_desp_22_23": {
+        # Título em B1; a coluna A está vazia
+        "conta_ap_contas_nacionais": [(2022, None, Layout(29, (1, 5, 6)))],
+    },
+    "script_divida": {
+        "divida_por_instrumento": [(2013, None, Layout(5, (0, 4)))],
+    },
+}
+
+
+def layout_for(extractor, quadro, year):
+    """Layout of that kind of quadro for the extractor in that year, or None (read the whole sheet)."""
+    for first, last, layout in LAYOUTS.get(extractor, {}).get(quadro, []):
+        if first <= int(year) and (last is None or int(year) <= last):
+            return layout
+    return None
+
+
+# === Leitura limitada à janela ===
+def read_options(layout, kwargs):
+    """pd.read_excel kwargs restricted to the layout's window.
+
+    Integer dtype keys are positions in the sheet; once usecols is given pandas
+    counts them among the columns read, so they are moved there.
+    """
+    options = dict(kwargs)
+    if layout.nrows is not None:
+        options["nrows"] = layout.nrows
+    if layout.usecols is not None:
+        options["usecols"] = list(layout.usecols)
+        if isinstance(options.get("dtype"), dict):
+            options["dtype"] = {layout.usecols.index(key) if isinstance(key, int) else key: value
+                                for key, value in options["dtype"].items()
+                                if not isinstance(key, int) or key in layout.usecols}
+    return options
+
+
+def expand(layout, df):
+    """Puts the columns read back at their sheet positions (the others are left empty),
+    so the extractors' iloc positions work as on a full read."""
+    if layout.usecols is None or df.empty:
+        return df
+    posicoes = {posicao: i for i, posicao in enumerate(layout.usecols)}
+    largura = layout.usecols[-1] + 1
+    vazia = pd.Series(np.nan, index=df.index, dtype=object)
+    expanded = pd.concat([df.iloc[:, posicoes[p]] if p in posicoes else vazia for p in range(largura)], axis=1)
+    expanded.columns = [df.columns[posicoes[p]] if p in posicoes else f"Unnamed: {p}" for p in range(largura)]
+    return expanded
@@ -0,0 +1,141 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+from workbook import DATA_DIR
+
+
+# "Mapa XIX - Transferências para os Municípios ........ 70" (o título pode partir-se em duas linhas)
+_ENTRADA_INDICE = re.compile(r"^(?P<titulo>.*?)\s*(?:\.{3,}|_{3,})\s*(?P<pagina>\d+)\s*$")
+_MAPA = re.compile(r"^Mapa\s+(?P<mapa>[IVXLC]+(?:-[A-Z])?)\s*-\s*(?P<titulo>.*)$", re.IGNORECASE)
+_CABECALHO_MAPA = re.compile(r"\bMAPA\s+(?P<mapa>[IVXLC]+(?:-[A-Z])?)\b", re.IGNORECASE)
+
+# Páginas do início do PDF onde se procura o índice
+PAGINAS_INDICE = 10
+
+
+def find_pdf(prefix, year, directory=DATA_DIR):
+    """Path of Mapas_pdf_YYYY.pdf (the years only published as PDF), or None."""
+    path = os.path.join(directory, f"{prefix}_pdf_{year}.pdf")
+    return path if os.path.exists(path) else None
+
+
+def _require_pdfplumber():
+    if pdfplumber is None:
+        raise ImportError("a extração de PDFs precisa do pdfplumber (pip install pdfplumber)")
+
+
+def _page_text(page):
+    # Nas páginas pares o PDF traz também o conteúdo da página anterior, fora da área visível
+    return page.crop(page.bbox).extract_text() or ""
+
+
+# === Índice de páginas (página → Mapa) ===
+def _entradas_indice(texto):
+    """[(title, printed page)] of the table of contents lines in texto."""
+    entradas, pendente = [], ""
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        if not linha:
+            continue
+        match = _ENTRADA_INDICE.match(f"{pendente} {linha}".strip())
+        if match:
+            entradas.append((" ".join(match["titulo"].split()), int(match["pagina"])))
+            pendente = ""
+        elif _MAPA.match(linha):
+            pendente = linha
+        elif pendente:
+            pendente = f"{pendente} {linha}"
+    return entradas
+
+
+def _index_from_contents(pdf):
+    texto = ""
+    for page in pdf.pages[:PAGINAS_INDICE]:
+        conteudo = _page_text(page)
+        if texto or re.search(r"^\s*Índice\s*$", conteudo, re.MULTILINE):
+            texto += conteudo + "\n"
+    entradas = _entradas_indice(texto)
+    index = {}
+    for i, (titulo, primeira) in enumerate(entradas):
+        match = _MAPA.match(titulo)
+        if not match:
+            continue
+        # O Mapa acaba onde começa a entrada seguinte do índice (ou no fim do PDF)
+        seguinte = next((pagina for _, pagina in entradas[i + 1:] if pagina > primeira), len(pdf.pages) + 1)
+        index[match["mapa"].upper()] = {"title": match["titulo"], "pages": list(range(primeira, seguinte))}
+    return index
+
+
+def _index_from_headers(pdf):
+    # Sem índice: lê o cabeçalho de cada página (bem mais lento, mas não depende do índice)
+    index, atual = {}, None
+    for numero, page in enumerate(pdf.pages, start=1):
+        topo = page.crop((0, 0, page.width, page.height * 0.15)).extract_text() or ""
+        match = _CABECALHO_MAPA.search(topo)
+        if match:
+            atual = match["mapa"].upper()
+            index.setdefault(atual, {"title": " ".join(topo[match.end():].split("\n")[0].strip(" -").split()),
+                                     "pages": []})
+        if atual:
+            index[atual]["pages"].append(numero)
+    return index
+
+
+def page_index(pdf_path):
+    """{mapa: {"title": ..., "pages": [1-based page numbers]}} of a Mapas PDF.
+
+    Built from the PDF's own table of contents, so only its first pages are read;
+    the first page of each Mapa is checked against its header. PDFs without a usable
+    table of contents fall back to reading the header of every page.
+    """
+    _require_pdfplumber()
+    with pdfplumber.open(pdf_path) as pdf:
+        index = _index_from_contents(pdf)
+        amostra = next(iter(index.values()), None)
+        if amostra and amostra["pages"][0] <= len(pdf.pages):
+            cabecalho = _page_text(pdf.pages[amostra["pages"][0] - 1])
+            if _CABECALHO_MAPA.search(cabecalho):
+                return index
+        return _index_from_headers(pdf)
+
+
+# === Extração por página, em paralelo ===
+def _map_pages_chunk(pdf_path, func, pages):
+    rows = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for numero in pages:
+            inicio = time.perf_counter()
+            page = pdf.pages[numero - 1]
+            try:
+                result, error = func(page.crop(page.bbox)), None
+            except Exception as e:
+                result, error = None, e
+            rows.append((numero, result, error, time.perf_counter() - inicio))
+    return rows
+
+
+def map_pages(pdf_path, func, pages, workers=None):
+    """Applies func(page) to each page number (cropped to its visible area).
+
+    With workers > 1 the pages are split across that many processes, each opening
+    the PDF once; func must then be a module-level function.
+    Returns [(page number, result, error, seconds)] in page order.
+    """
+    _require_pdfplumber()
+    pages = list(pages)
+    if not workers or workers <= 1 or len(pages) <= 1:
+        rows = _map_pages_chunk(pdf_path, func, pages)
+    else:
+        workers = min(workers, len(pages))
+        chunks = [pages[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_map_pages_chunk, pdf_path, func, chunk) for chunk in chunks]
+            rows = [row for future in futures for row in future.result()]
+    return sorted(rows, key=lambda row: row[0])
@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Etapas medidas: abrir o workbook, ler o índice de títulos, descodificar uma folha (ou lê-la
+# da cache), percorrer as linhas do bloco, converter os números, montar os programas e escrever o JSON
+STAGES = ("open", "index", "decode", "cache", "scan", "clean", "assemble", "write")
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_LOG_LEVEL = "WARNING"
+# Nível das mensagens quando um script corre sozinho sem --log-level
+LOG_LEVEL_ENV = "DESPESA_LOG_LEVEL"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where the resource module is missing."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def configure_logging(level=DEFAULT_LOG_LEVEL):
+    """Sends the extractors' log messages to stderr from level up.
+
+    DEBUG shows the DataFrames and rows the scripts go through (what they used to
+    print); the messages are only formatted when their level is on.
+    """
+    logging.basicConfig(level=level, format="%(message)s", force=True)
+
+
+# === Temporizadores e contadores de uma execução ===
+class Profiler:
+    """Timers and counters of one extraction run, per stage and per sheet.
+
+    stage() times a block, attributed to the sheet it is given or to the one of the
+    enclosing sheet() block; count() adds to a counter the same way. report()
+    returns everything as a JSON-ready dict and merge() adds the report of another process (map_sheets workers, batch jobs).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+        self.sheets = {}
+        self.peak_rss = None
+        self._sheet = None
+
+    @contextlib.contextmanager
+    def sheet(self, name):
+        anterior, self._sheet = self._sheet, name
+        try:
+            yield
+        finally:
+            self._sheet = anterior
+
+    @contextlib.contextmanager
+    def stage(self, name, sheet=None):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_time(name, time.perf_counter() - inicio, sheet or self._sheet)
+
+    def timed(self, name):
+        """Decorator form of stage()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def per_sheet(self, items, stage):
+        """Yields the (sheet, value) pairs of items; the loop body of each one is timed
+        under stage and attributed to that sheet."""
+        for sheet, value in items:
+            with self.sheet(sheet), self.stage(stage):
+                yield sheet, value
+
+    def count(self, name, n=1, sheet=None):
+        self.counters[name] += n
+        sheet = sheet or self._sheet
+        if sheet is not None:
+            self.sheets.setdefault(sheet, Counter())[name] += n
+
+    def _add_time(self, name, seconds, sheet, calls=1):
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += calls
+        if sheet is not None:
+            self.sheets.setdefault(sheet, Counter())[f"{name}_seconds"] += seconds
+
+    def report(self):
+        """{"wall_seconds", "peak_rss_bytes", "stages": {stage: {"seconds", "calls"}},
+        "counters": {...}, "sheets": {sheet: {"seconds", "<stage>_seconds", counters...}}}."""
+        picos = [pico for pico in (peak_rss_bytes(), self.peak_rss) if pico is not None]
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "peak_rss_bytes": max(picos) if picos else None,
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+            "counters": dict(self.counters),
+            "sheets": {
+                sheet: {"seconds": sum(v for k, v in valores.items() if k.endswith("_seconds")), **valores}
+                for sheet, valores in self.sheets.items()
+            },
+        }
+
+    def merge(self, report):
+        for name, entry in report["stages"].items():
+            self._add_time(name, entry["seconds"], None, entry["calls"])
+        self.counters.update(report["counters"])
+        for sheet, valores in report["sheets"].items():
+            self.sheets.setdefault(sheet, Counter()).update({k: v for k, v in valores.items() if k != "seconds"})
+        if report["peak_rss_bytes"] is not None:
+            self.peak_rss = max(self.peak_rss or 0, report["peak_rss_bytes"])
+
+
+# Perfil do processo (cada worker tem o seu e devolve-o no fim, ver workbook.map_sheets e batch.run_jobs)
+PERFIL = Profiler()
+
+
+def combine(reports, wall_seconds):
+    """Run report of several jobs' reports ({name: report}): their stages and counters
+    added up, the largest peak RSS and each job's own report under "jobs"."""
+    total = Profiler()
+    for report in reports.values():
+        total.merge(report)
+    combined = total.report()
+    del combined["sheets"]
+    return {**combined, "wall_seconds": wall_seconds, "jobs": reports}
+
+
+def format_stages(report):
+    """One line with the time of each stage, in pipeline order."""
+    stages = report["stages"]
+    partes = [f"{name} {stages[name]['seconds']:.2f}s" for name in STAGES if name in stages]
+    counters = report["counters"]
+    return (f"⏱ {', '.join(partes) or 'sem etapas'} | {counters.get('cells_decoded', 0)} células descodificadas, "
+            f"{counters.get('rows_scanned', 0)} linhas percorridas, {counters.get('bytes_written', 0)} bytes escritos")
+
+
+def write_report(path, report):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def report_path(output_path):
+    """.<name>.profile.json next to output_path (hidden, so the *.json globs over the outputs skip it)."""
+    folder, name = os.path.split(output_path)
+    return os.path.join(folder, f".{os.path.splitext(name)[0]}.profile.json")
+
+
+@contextlib.contextmanager
+def standalone(output_path, argv=None):
+    """Standalone run of an extractor script (python script_x.py [--log-level DEBUG]).
+
+    The log level comes from --log-level, else from $DESPESA_LOG_LEVEL, else
+    DEFAULT_LOG_LEVEL; once the run ends its report is written to report_path(output_path).
+    """
+    parser = argparse.ArgumentParser(description=f"Extrai {output_path} (ver batch.py para vários anos e datasets).")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=os.environ.get(LOG_LEVEL_ENV, DEFAULT_LOG_LEVEL),
+                        help=f"a partir de que nível se mostram as mensagens (por omissão, ${LOG_LEVEL_ENV} ou {DEFAULT_LOG_LEVEL})")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+    PERFIL.reset()
+    yield
+    report = PERFIL.report()
+    path = report_path(output_path)
+    write_report(path, report)
+    print(f"{format_stages(report)} → {path}")
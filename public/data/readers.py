@@ -0,0 +1,177 @@
+import argparse
+import contextlib
+import io
+import logging
+import os
+import re
+import sys
+import tempfile
+
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+from sheet_index import clean_title, pick_title, scan_titles
+
+log = logging.getLogger(__name__)
+
+
+# === Backends de leitura dos workbooks ===
+class PandasReader:
+    """pd.read_excel's own engines: xlrd for .xls, openpyxl for .xlsx (pure Python)."""
+
+    name = "pandas"
+    engine = None
+
+    def available(self):
+        return True
+
+    def open(self, path):
+        return pd.ExcelFile(path, engine=self.engine)
+
+    def titles(self, path):
+        """[(sheet name, title)] from the B2/A1 title cells (see sheet_index.scan_titles)."""
+        return scan_titles(path)
+
+
+class CalamineReader(PandasReader):
+    """python-calamine (Rust) for both .xls and .xlsx, through pandas' "calamine" engine."""
+
+    name = "calamine"
+    engine = "calamine"
+
+    def available(self):
+        return python_calamine is not None
+
+    def titles(self, path):
+        book = python_calamine.CalamineWorkbook.from_path(str(path))
+        try:
+            entries = []
+            for name in book.sheet_names:
+                rows = book.get_sheet_by_name(name).to_python(skip_empty_area=False, nrows=2)
+                a1 = rows[0][0] if rows and rows[0] else None
+                b2 = rows[1][1] if len(rows) > 1 and len(rows[1]) > 1 else None
+                entries.append((name, pick_title([b2, a1])))
+        finally:
+            book.close()
+        return [(name, clean_title(title)) for name, title in entries if title]
+
+
+READERS = {reader.name: reader for reader in (PandasReader(), CalamineReader())}
+DEFAULT_READER = "pandas"
+
+
+def get_reader(name=None):
+    """Reader backend by name; one whose library is not installed falls back to pandas."""
+    reader = READERS[name or DEFAULT_READER]
+    if not reader.available():
+        log.warning("⚠️ leitor %s indisponível (pip install python-calamine); a usar %s", reader.name, DEFAULT_READER)
+        return READERS[DEFAULT_READER]
+    return reader
+
+
+# === Comparação de backends ===
+# Escapes OOXML ("_x000D_" = \r) que o openpyxl deixa por descodificar no modo read-only
+_ESCAPE_OOXML = re.compile(r"_x([0-9A-Fa-f]{4})_")
+
+
+def _cells_equal(a, b):
+    # 5 e 5.0 são o mesmo valor, tal como None e NaN (célula vazia); "5" e 5 não
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) and pd.isna(b)
+    if isinstance(a, str) != isinstance(b, str):
+        return False
+    if isinstance(a, str):
+        a, b = (_ESCAPE_OOXML.sub(lambda m: chr(int(m[1], 16)), texto) for texto in (a, b))
+    return a == b
+
+
+def compare_frames(a, b):
+    """[(row, column, value a, value b)] of the cells where two raw sheet reads differ."""
+    diferencas = []
+    linhas, colunas = max(a.shape[0], b.shape[0]), max(a.shape[1], b.shape[1])
+    for i in range(linhas):
+        for j in range(colunas):
+            va = a.iat[i, j] if i < a.shape[0] and j < a.shape[1] else None
+            vb = b.iat[i, j] if i < b.shape[0] and j < b.shape[1] else None
+            if not _cells_equal(va, vb):
+                diferencas.append((i, j, va, vb))
+    return diferencas
+
+
+def compare(year, readers=("pandas", "calamine"), datasets=None):
+    """Runs the year's extractors with each reader and compares what they read.
+
+    Returns {"sheets": {sheet: [cell differences]}, "outputs": {dataset: identical?}};
+    sheets are the quadros the extractors read, compared cell by cell as raw values
+    (header=None), and outputs are the JSON files each reader produced.
+    """
+    from extrair_ano import EXTRACTORS
+    from workbook import WorkbookSession, find_workbook
+
+    extractors = [EXTRACTORS[dataset] for dataset in (datasets or EXTRACTORS)]
+    report = {"sheets": {}, "outputs": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        lidas = {}
+        for reader in readers:
+            for extractor in extractors:
+                excel_path = find_workbook(extractor.prefix, year)
+                if excel_path is None or extractor.module_for(year) is None:
+                    continue
+                output_path = os.path.join(tmp, reader, extractor.dataset, f"{year}.json")
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with WorkbookSession(excel_path, cache=False, reader=reader) as workbook:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        extractor.extract(workbook, year, output_path)
+                    for sheet in workbook.sheets_read:
+                        lidas.setdefault((excel_path, sheet), None)
+
+        for excel_path, sheet in lidas:
+            frames = []
+            for reader in readers:
+                with WorkbookSession(excel_path, cache=False, reader=reader) as workbook:
+                    frames.append(workbook.read(sheet, header=None))
+            report["sheets"][f"{os.path.basename(excel_path)}:{sheet}"] = compare_frames(*frames)
+
+        for extractor in extractors:
+            conteudos = set()
+            for reader in readers:
+                path = os.path.join(tmp, reader, extractor.dataset, f"{year}.json")
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        conteudos.add(f.read())
+            if conteudos:
+                report["outputs"][extractor.dataset] = len(conteudos) == 1
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara os backends de leitura nos quadros que os extratores usam.")
+    parser.add_argument("years", nargs="+", type=int)
+    parser.add_argument("--readers", nargs=2, choices=sorted(READERS), default=["pandas", "calamine"])
+    parser.add_argument("--datasets", nargs="+", default=None)
+    args = parser.parse_args(argv)
+
+    for name in args.readers:
+        if not READERS[name].available():
+            parser.error(f"leitor {name} indisponível (pip install python-calamine)")
+
+    ok = True
+    for year in args.years:
+        report = compare(year, args.readers, args.datasets)
+        for sheet, diferencas in report["sheets"].items():
+            ok &= not diferencas
+            print(f"{'✓' if not diferencas else '✗'} {sheet:<32} {len(diferencas)} célula(s) diferente(s)")
+            for i, j, a, b in diferencas[:5]:
+                print(f"    [{i}, {j}] {args.readers[0]}={a!r} {args.readers[1]}={b!r}")
+        for dataset, igual in report["outputs"].items():
+            ok &= igual
+            print(f"{'✓' if igual else '✗'} {dataset}:{year} output {'idêntico' if igual else 'diferente'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import gzip
+import json
+import math
+import os
+
+from perfil import PERFIL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Unidade dos montantes de cada dataset, em euros (os quadros da CGE vêm em milhões)
+UNIDADES = {
+    "despesa": 1_000_000,
+    "balanco": 1_000_000,
+    "divida": 1_000_000,
+    "municipality_transfers": 1,
+}
+
+# Campos que são percentagens ou rácios, e não montantes
+PERCENT_KEYS = {"grau_execução", "grau_execucao", "PIBper", "Divida em %PIB", "NationalPercentage", "DistrictPercentage"}
+
+DEFAULT_EURO_DECIMALS = 2
+DEFAULT_PERCENT_DECIMALS = 4
+
+
+def quantize(data, unit=1, euro_decimals=DEFAULT_EURO_DECIMALS, percent_decimals=DEFAULT_PERCENT_DECIMALS, key=None):
+    """Copy of data with every float rounded: amounts to euro_decimals places of a euro
+    (so 8 decimals for values in millions and cents), percentages to percent_decimals."""
+    if isinstance(data, dict):
+        return {k: quantize(v, unit, euro_decimals, percent_decimals, k) for k, v in data.items()}
+    if isinstance(data, list):
+        return [quantize(v, unit, euro_decimals, percent_decimals, key) for v in data]
+    if isinstance(data, float) and math.isfinite(data):
+        if key in PERCENT_KEYS:
+            return round(data, percent_decimals)
+        return round(data, euro_decimals + round(math.log10(unit)))
+    return data
+
+
+def _count_written(size):
+    PERFIL.count("files_written")
+    PERFIL.count("bytes_written", size)
+
+
+def _write_bytes(path, payload):
+    with open(path, "wb") as f:
+        f.write(payload)
+    _count_written(len(payload))
+    return path
+
+
+def write_compressed(path, payload):
+    """Writes the .gz (and, when the brotli module is installed, .br) siblings of path;
+    returns their paths."""
+    # mtime=0 para o .gz ser igual de build para build
+    written = [_write_bytes(f"{path}.gz", gzip.compress(payload, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        written.append(_write_bytes(f"{path}.br", brotli.compress(payload, quality=11)))
+    return written
+
+
+def _remove_compressed(path):
+    # Não deixa para trás versões comprimidas de uma build anterior
+    for sibling in (f"{path}.gz", f"{path}.br"):
+        if os.path.exists(sibling):
+            os.unlink(sibling)
+
+
+# === Escrita do JSON de um extrator ===
+@PERFIL.timed("write")
+def escrever_json(data, path, dataset, saida=None, **dump_kwargs):
+    """Writes an extractor's output.
+
+    Without saida (or with compact false) the file is written exactly as the
+    scripts always did, with their own json.dump arguments. With
+    saida={"compact": True, ...} the JSON is minified and quantized, and gzip /
+    Brotli siblings are written next to it unless saida["compress"] is false.
+    Other keys: euro_decimals (2 = cents) and percent_decimals (4).
+    Returns the paths written (path and its compressed siblings).
+    """
+    saida = saida or {}
+    if not saida.get("compact"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            _count_written(f.tell())
+        _remove_compressed(path)
+        return [path]
+
+    data = quantize(
+        data,
+        UNIDADES.get(dataset, 1),
+        saida.get("euro_decimals", DEFAULT_EURO_DECIMALS),
+        saida.get("percent_decimals", DEFAULT_PERCENT_DECIMALS),
+    )
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    written = [_write_bytes(path, payload)]
+    if saida.get("compress", True):
+        written += write_compressed(path, payload)
+    else:
+        _remove_compressed(path)
+    return written
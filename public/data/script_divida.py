@@ -1,5 +1,14 @@
+import logging
+
 import pandas as pd
-import json
+
+from layouts import layout_for
+from perfil import PERFIL, standalone
+from saida import escrever_json
+from sheet_index import resolve_quadros
+from workbook import open_workbook
+
+log = logging.getLogger(__name__)
 
 # Load the Excel file
 year = 2013
@@ -21,58 +30,69 @@ sheet_name_list = {
 
 output_path = f"../divida/{year}.json"
 
-# Read the sheets
-dfs = {sheet_name: pd.read_excel(excel_path, sheet_name=sheet_name) for sheet_name in sheet_name_list[year]}
-
-all_data = {}
-
-for sheet_name, df in dfs.items():
-    print(f"Processing sheet: {sheet_name}")
-
-    # Ajuste inicial: headers e corte
-    df.columns = df.iloc[2]
-    df = df[3:]  # Remove header rows
-
-    # Seleciona colunas de interesse (assumindo que a 2ª e 6ª colunas são as relevantes)
-    df = df.iloc[:, [0, 4]]
-
-    # Filtra as primeiras 3 linhas (ajuste conforme necessário)
-    df = df.iloc[:2]
-
-    # Renomeia colunas
-    df.columns = ["Name", "Value"]
-    df.reset_index(drop=True, inplace=True)
-
-    print("📄 Preview do DataFrame:")
-    print(df)
-    print("\n")
-
-    for _, row in df.iterrows():
-        name = str(row["Name"]).strip()
-        value = row["Value"]
-
-        # Criar estrutura adequada
-        if "Maastricht" in name:
-            row_dict = {
-                "Divida em milhões de euros": value
-            }
-        elif "% PIB" in name:
-            row_dict = {
-                "Divida em %PIB": value
-            }
-        else:
-            row_dict = {
-                name: {
-                    "Year": value
+# === Script principal ===
+def processar_excel(excel_path, year, output_path, saida=None, workbook=None, **leitura):
+    # Read the sheets
+    with open_workbook(excel_path, workbook, **leitura) as workbook:
+        # Anos sem entrada em sheet_name_list são resolvidos pelo título do quadro
+        sheets = resolve_quadros(workbook, year, sheet_name_list, "divida_por_instrumento", first=True)
+        # Só se descodifica a janela do quadro que é usada (ver layouts.LAYOUTS)
+        layout = layout_for("script_divida", "divida_por_instrumento", year)
+        dfs = {sheet_name: workbook.read(sheet_name, layout=layout) for sheet_name in sheets}
+
+    all_data = {}
+
+    for sheet_name, df in PERFIL.per_sheet(dfs.items(), "scan"):
+        log.debug("Processing sheet: %s", sheet_name)
+
+        # Ajuste inicial: headers e corte
+        df.columns = df.iloc[2]
+        df = df[3:]  # Remove header rows
+
+        # Seleciona colunas de interesse (assumindo que a 2ª e 6ª colunas são as relevantes)
+        df = df.iloc[:, [0, 4]]
+
+        # Filtra as primeiras 3 linhas (ajuste conforme necessário)
+        df = df.iloc[:2]
+
+        # Renomeia colunas
+        df.columns = ["Name", "Value"]
+        df.reset_index(drop=True, inplace=True)
+
+        log.debug("📄 Preview do DataFrame:\n%s\n", df)
+        PERFIL.count("rows_scanned", len(df))
+
+        for _, row in df.iterrows():
+            name = str(row["Name"]).strip()
+            value = row["Value"]
+
+            # Criar estrutura adequada
+            if "Maastricht" in name:
+                row_dict = {
+                    "Divida em milhões de euros": value
                 }
-            }
+            elif "% PIB" in name:
+                row_dict = {
+                    "Divida em %PIB": value
+                }
+            else:
+                row_dict = {
+                    name: {
+                        "Year": value
+                    }
+                }
+
+            # Atualiza o dicionário principal
+            all_data.update(row_dict)
+            log.debug("📌 Linha adicionada: %s", row_dict)
+
+    # Salvar para JSON
+    return escrever_json(all_data, output_path, "divida", saida, indent=4, ensure_ascii=False)
 
-        # Atualiza o dicionário principal
-        all_data.update(row_dict)
-        print("📌 Linha adicionada:", row_dict)
+    log.info("✅ JSON salvo em: %s", output_path)
 
-# Salvar para JSON
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(all_data, f, indent=4, ensure_ascii=False)
 
-print(f"\n✅ JSON salvo em: {output_path}")
+# === Executar ===
+if __name__ == "__main__":
+    with standalone(output_path):
+        processar_excel(excel_path, year, output_path)
@@ -20,6 +20,9 @@
 import pandas as pd
 import json
 
+from sheet_index import resolve_quadros
+from workbook import WorkbookSession
+
 # Load the Excel file
 year = 2
 excel_path = f"Quadros_{year}.xlsx"
@@ -43,7 +46,10 @@ output_path = f"../despesa/{year}.json"
 
 
 # Read the sheets
-dfs = {sheet_name: pd.read_excel(excel_path, sheet_name=sheet_name) for sheet_name in sheet_name_list[year]}
+with WorkbookSession(excel_path) as workbook:
+    # Anos sem entrada em sheet_name_list são resolvidos pelo título do quadro
+    sheets = resolve_quadros(workbook, year, sheet_name_list, "medidas_programa")
+    dfs = {sheet_name: workbook.read(sheet_name) for sheet_name in sheets}
 
 # Dictionary to store the data
 all_data = {}
@@ -1,12 +1,26 @@
+import logging
+
 import pandas as pd
-import json
+
+from despesa_shards import write_shards
+from extracao import FIM_MEDIDAS, bloco_medidas, numeros_pt
+from layouts import layout_for
+from perfil import PERFIL, standalone
+from saida import escrever_json
+from sheet_index import resolve_quadros
+from workbook import open_workbook
+
+log = logging.getLogger(__name__)
 
 # === Definições de entrada/saída ===
 year = 2
 excel_path = f"Quadros_{year}.xls"
 output_path = f"../despesa_atual/{year}.json"
+# Processos para os quadros azuis (None = um a um, no processo principal)
+workers = None
 
 # Quadros - Despesa por medidas do Programa
+# (anos sem entrada aqui são resolvidos pelo título, ver sheet_index.QUADROS)
 sheet_name_list_azuis = {
     2023: ["Quadro 4.7.", "Quadro 4.9.", "Quadro 4.16.", "Quadro 4.18.", "Quadro 4.20.", "Quadro 4.22.", "Quadro 4.24.", "Quadro 4.26.", "Quadro 4.29.", "Quadro 4.32.", "Quadro 4.36.", "Quadro 4.46.", "Quadro 4.48.", "Quadro 4.54.", "Quadro 4.59.", "Quadro 4.62.", "Quadro 4.66."],
     2022: ["Quadro 4.7.", "Quadro 4.9.", "Quadro 4.14.", "Quadro 4.16.", "Quadro 4.21.", "Quadro 4.23.", "Quadro 4.26.", "Quadro 4.28.", "Quadro 4.31.", "Quadro 4.34.", "Quadro 4.38.", "Quadro 4.48.", "Quadro 4.50.", "Quadro 4.56.", "Quadro 4.60.", "Quadro 4.63.", "Quadro 4.67."],
@@ -35,73 +49,41 @@ sheet_name_list_laranjas = {
     2013: ["Quadro 116"],
 }
 
-def limpar_valor(valor):
-    if isinstance(valor, str):
-        # Remove espaços normais e não separáveis, e troca vírgula por ponto
-        valor_limpo = valor.replace('\xa0', '').replace(' ', '').replace(' ', '').replace(',', '.')
-        try:
-            return float(valor_limpo)
-        except ValueError:
-            return 0.0
-    elif isinstance(valor, (int, float)):
-        return float(valor)
-    else:
-        return 0.0
 
+# === Função para extrair as medidas de um quadro azul ===
+def extrair_medidas_quadro(sheet, df):
+    log.debug("%s", sheet)
+    # Bloco entre "Estado, SFA e EPR" e "DESPESA TOTAL CONSOLIDADA", sem as linhas "sub-total"
+    nomes, valores = bloco_medidas(df, coluna_nome=1, coluna_valor=3)
+    return dict(zip(nomes, numeros_pt(valores, vazio=float("nan")).tolist()))
 
 
 # === Função para extrair medidas por setor (quadros azuis) ===
-def extrair_medidas_por_programa(sheet_names, path_excel):
+def extrair_medidas_por_programa(sheet_names, workbook, workers=None, layout=None):
     medidas_por_programa = {}
-    for sheet in sheet_names:
-        print(sheet)
-        try:
-            df = pd.read_excel(path_excel, sheet_name=sheet, header=0)
-            medidas = {}
-
-            inicio_leitura = False
-            for i in range(len(df)):
-                linha_atual = str(df.iloc[i, 1]).strip()
-                
-
-                # Ativa a leitura após encontrar a linha-chave
-                if not inicio_leitura and "Estado, SFA e EPR" in linha_atual:
-                    inicio_leitura = True
-                    continue  # Ir para a próxima linha
-
-                if inicio_leitura:
-                    if "DESPESA TOTAL CONSOLIDADA" in linha_atual.upper():
-                        break  # Parar a leitura ao encontrar essa linha
-
-                    if pd.notna(linha_atual) and linha_atual.lower() != "sub-total":
-                        """valor_raw = df.iloc[i, 3] if pd.notna(df.iloc[i, 3]) else 0
-                        print(valor_raw)
-                        valor_limpo = limpar_valor(valor_raw)
-                        medidas[linha_atual] = valor_limpo"""
-                        print(f"linha {i}, valor bruto: {repr(df.iloc[i, 3])}")
-                        valor_raw = df.iloc[i, 3]
-                        valor = limpar_valor(valor_raw)
-                        medidas[linha_atual] = valor_raw
-
-                        """valor = df.iloc[i, 3] if pd.notna(df.iloc[i, 3]) else 0
-                        print(valor)
-                        medidas[linha_atual] = valor"""
-
-            medidas_por_programa[sheet] = medidas
-        except Exception as e:
-            print(f"Erro ao processar {sheet}: {e}")
+    # Os quadros são independentes: com workers > 1 são descodificados e extraídos em paralelo,
+    # e os resultados voltam pela ordem de sheet_names (o emparelhamento por posição depende disso).
+    # Em streaming cada quadro só é lido até à linha DESPESA TOTAL CONSOLIDADA
+    resultados = workbook.map_sheets(extrair_medidas_quadro, sheet_names, workers=workers, stop_at=FIM_MEDIDAS, layout=layout, header=0)
+    for sheet, medidas, erro in resultados:
+        if erro is not None:
+            log.warning("Erro ao processar %s: %s", sheet, erro)
+            continue
+        medidas_por_programa[sheet] = medidas
+    log.info("%s", workbook.map_report())
     return medidas_por_programa
 
 
 # === Função para extrair dados do quadro laranja ===
+@PERFIL.timed("assemble")
 def extrair_programas_orcamentais(df_laranja, medidas_programas):
     programas = {}
     # Definindo setores sem medidas
     #setores_sem_medidas = ["PO10", "PO11", "PO19"]
     for i in range(3, 23):  # Linhas 6 a 22 (0-indexed)
-        print("primeior i a la por", i)
+        log.debug("linha %d", i)
         nome_setor = str(df_laranja.iloc[i, 1]).strip()
-        print(nome_setor)
+        log.debug("%s", nome_setor)
         if pd.notna(nome_setor) and nome_setor.lower() != "sub-total":
             try:
                 orcamentada = float(df_laranja.iloc[i, 4])
@@ -129,22 +111,26 @@ def extrair_programas_orcamentais(df_laranja, medidas_programas):
                     "grau_execução": percentagem_execucao,
                     "medidas":  medidas_finais,
                 }
-                print(quadro_azul)
+                log.debug("%s", quadro_azul)
             except Exception as e:
-                print(f"Erro no setor {nome_setor}: {e} {i}")
+                log.debug("linha %d ignorada (%s): %s", i, nome_setor, e)
                 continue
     return programas
 
 
 # === Script principal ===
-def processar_excel(path_excel, ano, path_output):
+def processar_excel(path_excel, ano, path_output, workers=None, saida=None, workbook=None, **leitura):
     output = {}
 
-    quadro_laranja = sheet_name_list_laranjas[ano][0]
-    quadros_azuis = sheet_name_list_azuis[ano]
-
-    df_laranja = pd.read_excel(path_excel, sheet_name=quadro_laranja, header=0)
-    medidas_programas = extrair_medidas_por_programa(quadros_azuis, path_excel)
+    # O workbook é aberto uma única vez e partilhado por todos os quadros
+    # (leitura: opções da WorkbookSession, p.ex. stream=True, memory_budget=...;
+    # workbook: uma sessão já aberta, partilhada com os extratores dos outros datasets)
+    with open_workbook(path_excel, workbook, **leitura) as workbook:
+        quadro_laranja = resolve_quadros(workbook, ano, sheet_name_list_laranjas, "despesa_por_programa", first=True)[0]
+        quadros_azuis = resolve_quadros(workbook, ano, sheet_name_list_azuis, "medidas_programa")
+        df_laranja = workbook.read(quadro_laranja, layout=layout_for("script_efet_atual", "despesa_por_programa", ano), header=0)
+        medidas_programas = extrair_medidas_por_programa(quadros_azuis, workbook, workers,
+                                                         layout_for("script_efet_atual", "medidas_programa", ano))
     programas_orcamentais = extrair_programas_orcamentais(df_laranja, medidas_programas)
 
     output[ano] = {
@@ -154,9 +140,12 @@ def processar_excel(path_excel, ano, path_output):
         "setores": programas_orcamentais
     }
 
-    with open(path_output, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    written = escrever_json(output, path_output, "despesa", saida, ensure_ascii=False, indent=2)
+    # Índice do ano e um ficheiro por setor, para /api/despesa?sector= não ler o ano inteiro
+    return written + write_shards(output, path_output, saida)
 
 
 # === Executar ===
-processar_excel(excel_path, year, output_path)
+if __name__ == "__main__":
+    with standalone(output_path):
+        processar_excel(excel_path, year, output_path, workers)
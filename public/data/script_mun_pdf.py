@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+
+from extracao import numeros_pt
+from gadm_ids import GidIndex, anotar, report_unmatched
+from pdf_mapas import map_pages, page_index
+from perfil import PERFIL, standalone
+from saida import escrever_json
+from transferencias import write_views
+
+log = logging.getLogger(__name__)
+
+# Anos em que os Mapas só foram publicados em PDF (ver script_mun.py para os .xls)
+
+year = 2014
+mapa = "XIX"
+pdf_path = f"Mapas_pdf_{year}.pdf"
+output_path = f"../municipality_transfers/{year}.json"
+
+
+# Distância máxima (em pontos) entre os grupos de milhares de um mesmo número
+GAP_MILHARES = 5
+_NUMERO = re.compile(r"^-?[\d.,]+%?$|^-$")
+# Valor em pt-PT: "8353467", "8.353.467", "1.234,56", "12,5" ou "12.5"
+_VALOR_PT = re.compile(r"-?(?:\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?)")
+# Rodapé de cada página ("Conta Geral do Estado de 2014 71")
+_RODAPE = re.compile(r"^Conta Geral do Estado", re.IGNORECASE)
+
+
+def _valor(texto):
+    # "8 353 467" → 8353467.0, "1.234,56" → 1234.56; o que não for número ("-", nomes) fica None
+    texto = texto.replace("\xa0", "").replace(" ", "")
+    if not re.fullmatch(r"-?[\d.,]+", texto):
+        return None
+    if not _VALOR_PT.fullmatch(texto):
+        raise ValueError(f"Valor mal formado no Mapa {mapa}: {texto!r}")
+    return float(numeros_pt([texto])[0])
+
+
+def _is_district(nome):
+    # Critério do script_mun.py, mas "LAGOA (AÇORES)" é um município e não o cabeçalho dos Açores
+    return "(distrito)" in nome.lower() or nome.lower() in ("madeira", "açores")
+
+
+def _linhas_de_palavras(words, tolerancia=2):
+    linhas = []
+    for word in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        if linhas and abs(linhas[-1][0]["top"] - word["top"]) <= tolerancia:
+            linhas[-1].append(word)
+        else:
+            linhas.append([word])
+    return [sorted(linha, key=lambda w: w["x0"]) for linha in linhas]
+
+
+# === Linhas de uma página do Mapa XIX ===
+def linhas_pagina(page):
+    """[(name, total)] of one Mapa XIX page, in reading order; district headers have total None.
+
+    Rows are rebuilt from word positions (the page's ruling lines do not close the
+    last block of each page): the name is the text before the first number and the
+    total (column 8) is the rightmost number, whose thousands groups sit a few points apart.
+    """
+    linhas = []
+    for palavras in _linhas_de_palavras(page.extract_words()):
+        primeiro = next((i for i, w in enumerate(palavras) if _NUMERO.match(w["text"])), len(palavras))
+        nome = " ".join(w["text"] for w in palavras[:primeiro])
+        if not nome or _RODAPE.match(nome):
+            continue
+        if primeiro == len(palavras):
+            if _is_district(nome):
+                linhas.append((nome, None))
+            continue
+        fim = len(palavras) - 1
+        inicio = fim
+        while inicio > primeiro and palavras[inicio]["x0"] - palavras[inicio - 1]["x1"] <= GAP_MILHARES:
+            inicio -= 1
+        valor = _valor("".join(w["text"] for w in palavras[inicio:fim + 1]))
+        if valor is not None:
+            linhas.append((nome, valor))
+    return linhas
+
+
+# === Script principal ===
+def processar_pdf(pdf_path, year, output_path, workers=None, saida=None):
+    index = page_index(pdf_path)
+    if mapa not in index:
+        raise ValueError(f"Mapa {mapa} não encontrado no índice de {pdf_path}")
+    pages = index[mapa]["pages"]
+    log.info("Mapa %s (%s): páginas %s-%s", mapa, index[mapa]["title"], pages[0], pages[-1])
+
+    linhas = []
+    with PERFIL.stage("decode"):
+        for numero, result, error, _ in map_pages(pdf_path, linhas_pagina, pages, workers):
+            if error is not None:
+                log.warning("⚠️ Erro na página %s: %s", numero, error)
+                continue
+            linhas.extend(result)
+    PERFIL.count("pages_decoded", len(pages))
+    PERFIL.count("rows_decoded", len(linhas))
+
+    # Output structure
+    districts = []
+    current_block = {}
+    country_total = None
+
+    for nome, valor in linhas:
+        if valor is None:
+            if current_block:
+                districts.append(current_block)
+            current_block = {
+                "District": nome.replace("(distrito)", "").strip(),
+                "Total": None,
+                "Municipalities": {}
+            }
+        elif nome.upper() == "TOTAL GERAL":
+            country_total = valor
+        elif nome.upper() == "TOTAL":
+            if current_block:
+                current_block["Total"] = valor
+        elif nome.upper().startswith("TOTAL"):
+            # TOTAL CONTINENTE e outros subtotais que não são de um distrito
+            continue
+        elif current_block:
+            current_block["Municipalities"][nome] = valor
+
+    if current_block:
+        districts.append(current_block)
+
+    final_output = {
+        "Country": "Portugal",
+        "Year": year,
+        "Total": country_total,
+        "Districts": districts
+    }
+
+    ids = GidIndex.load()
+    final_output = anotar(final_output, ids)
+    report_unmatched(ids)
+
+    written = escrever_json(final_output, output_path, "municipality_transfers", saida, ensure_ascii=False, indent=2)
+    return written + write_views(final_output, output_path, saida)
+
+    log.info("JSON saved to %s", output_path)
+
+
+# === Executar ===
+if __name__ == "__main__":
+    with standalone(output_path):
+        processar_pdf(pdf_path, year, output_path, workers=os.cpu_count())
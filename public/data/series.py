@@ -0,0 +1,166 @@
+import argparse
+import math
+import os
+import shutil
+import sys
+import time
+
+from despesa_shards import slug
+from saida import escrever_json
+from store import DEFAULT_SOURCE_DIR, build_tables
+
+
+DEFAULT_SERIES_DIR = os.path.join(DEFAULT_SOURCE_DIR, "series")
+
+
+def _valor(value):
+    # NaN não é JSON válido para o browser: um ano sem valor fica a null
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+def _anos(df):
+    """Every year from the first to the last one in df, so that missing years show up as gaps."""
+    years = sorted(int(year) for year in df["year"].unique())
+    return list(range(years[0], years[-1] + 1)) if years else []
+
+
+def _serie(anos, rows, columns):
+    """{year: value} (one column) or {year: {column: value}} for the given years; null where a year has no row."""
+    por_ano = {int(row["year"]): row for row in rows}
+    serie = {}
+    for year in anos:
+        row = por_ano.get(year)
+        if row is None:
+            serie[str(year)] = None
+        elif isinstance(columns, str):
+            serie[str(year)] = _valor(row[columns])
+        else:
+            serie[str(year)] = {name: _valor(row[column]) for name, column in columns.items()}
+    return serie
+
+
+def _series_por(df, key, anos, columns):
+    return {name: _serie(anos, group.to_dict("records"), columns) for name, group in df.groupby(key, sort=False)}
+
+
+# === Séries da despesa: por setor e por medida ===
+DESPESA_COLUNAS = {
+    "orcamentado": "despesa_orcamentada",
+    "executado": "despesa_executada_efetiva_consolidada",
+    "grau_execucao": "grau_execucao",
+}
+
+
+def despesa_series(tables):
+    """(overview, {file name: per-sector series}) from the despesa_* store tables."""
+    anos_df, setores, medidas = tables["despesa_anos"], tables["despesa_setores"], tables["despesa_medidas"]
+    anos = _anos(anos_df)
+    overview = {
+        "anos": anos,
+        "total": _serie(anos, anos_df.to_dict("records"), DESPESA_COLUNAS),
+        "setores": _series_por(setores, "sector", anos, DESPESA_COLUNAS),
+        "ficheiros": {},
+    }
+    ficheiros = {}
+    medidas_por_setor = dict(tuple(medidas.groupby("sector", sort=False)))
+    for sector, serie in overview["setores"].items():
+        nome = f"{slug(sector)}.json"
+        overview["ficheiros"][sector] = nome
+        grupo = medidas_por_setor.get(sector)
+        ficheiros[nome] = {
+            "sector": sector,
+            "anos": anos,
+            "total": serie,
+            "medidas": _series_por(grupo, "medida", anos, "valor") if grupo is not None else {},
+        }
+    return overview, ficheiros
+
+
+# === Séries das transferências: por distrito e por município ===
+def transferencias_series(tables):
+    pais, distritos, municipios = (tables["transferencias_pais"], tables["transferencias_distritos"],
+                                   tables["transferencias_municipios"])
+    anos = _anos(pais)
+    overview = {
+        "anos": anos,
+        "total": _serie(anos, pais.to_dict("records"), "total"),
+        "distritos": _series_por(distritos, "district", anos, "total"),
+        "ficheiros": {},
+    }
+    ficheiros = {}
+    municipios_por_distrito = dict(tuple(municipios.groupby("district", sort=False)))
+    for district, serie in overview["distritos"].items():
+        nome = f"{slug(district)}.json"
+        overview["ficheiros"][district] = nome
+        grupo = municipios_por_distrito.get(district)
+        ficheiros[nome] = {
+            "district": district,
+            "anos": anos,
+            "total": serie,
+            "municipios": _series_por(grupo, "municipality", anos, "total") if grupo is not None else {},
+        }
+    return overview, ficheiros
+
+
+# === Série do balanço: receita, despesa, saldo e saldo em % do PIB ===
+BALANCO_COLUNAS = {"executado": "executado", "orcamentado": "orcamentado"}
+
+
+def balanco_series(tables):
+    """(overview, {}) from the balanco store table: one series per rubrica, in a single file."""
+    balanco = tables["balanco"]
+    anos = _anos(balanco)
+    return {"anos": anos, "rubricas": _series_por(balanco, "rubrica", anos, BALANCO_COLUNAS)}, {}
+
+
+SERIES = {
+    # nome → (tabelas necessárias, função, dataset para a escrita em modo compacto)
+    "despesa": (("despesa_anos", "despesa_setores", "despesa_medidas"), despesa_series, "despesa"),
+    "transferencias": (("transferencias_pais", "transferencias_distritos", "transferencias_municipios"),
+                       transferencias_series, "municipality_transfers"),
+    "balanco": (("balanco",), balanco_series, "balanco"),
+}
+
+
+def write_series(source_dir=DEFAULT_SOURCE_DIR, series_dir=DEFAULT_SERIES_DIR, saida=None):
+    """Reads every year once and writes <series_dir>/<name>.json plus, for the series split
+    per sector or district, <series_dir>/<name>/<slug>.json.
+
+    Returns {name: number of files written}.
+    """
+    tables = build_tables(source_dir)
+    counts = {}
+    for name, (needed, builder, dataset) in SERIES.items():
+        if not all(table in tables for table in needed):
+            continue
+        overview, ficheiros = builder(tables)
+        folder = os.path.join(series_dir, name)
+        # A pasta é reescrita por inteiro: setores ou distritos que desapareceram não deixam ficheiros
+        shutil.rmtree(folder, ignore_errors=True)
+        if ficheiros:
+            os.makedirs(folder)
+        for file_name, serie in ficheiros.items():
+            escrever_json(serie, os.path.join(folder, file_name), dataset, saida, ensure_ascii=False, separators=(",", ":"))
+        escrever_json(overview, os.path.join(series_dir, f"{name}.json"), dataset, saida,
+                      ensure_ascii=False, separators=(",", ":"))
+        counts[name] = len(ficheiros) + 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Escreve as séries temporais (todos os anos) por setor, medida, distrito e município.")
+    parser.add_argument("--source-dir", default=DEFAULT_SOURCE_DIR, help="pasta com despesa/, municipality_transfers/, ...")
+    parser.add_argument("--series-dir", default=DEFAULT_SERIES_DIR)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    for name, files in write_series(args.source_dir, args.series_dir).items():
+        print(f"✓ {name:<16} {files:>4} ficheiros")
+    print(f"\n📈 séries em {args.series_dir} ({time.perf_counter() - inicio:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
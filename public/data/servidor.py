@@ -0,0 +1,285 @@
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from despesa_shards import INDEX_NAME
+from transferencias import LEVELS, js_number_string
+from workbook import DATA_DIR
+
+
+DEFAULT_PUBLIC_DIR = os.path.dirname(DATA_DIR)
+DEFAULT_CACHE_ENTRIES = 256
+DEFAULT_CACHE_MB = 64
+# Respostas mais pequenas do que isto não compensam o gzip
+GZIP_MIN_BYTES = 1024
+
+Response = namedtuple("Response", ["status", "body", "gzip", "etag"])
+
+
+# === Serialização igual à do JSON.stringify ===
+def js_json(value):
+    """Compact JSON as JSON.stringify writes it (what NextResponse.json sends):
+    5.0 → 5, 1e-05 → 0.00001, NaN/Infinity → null."""
+    if isinstance(value, float):
+        return js_number_string(value) if math.isfinite(value) else "null"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{json.dumps(str(k), ensure_ascii=False)}:{js_json(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, list):
+        return "[" + ",".join(js_json(v) for v in value) + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _response(status, body):
+    if isinstance(body, (dict, list)):
+        body = js_json(body).encode("utf-8")
+    # ETag forte: muda sempre que os bytes mudam (a variante gzip tem o seu próprio ETag)
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    comprimido = gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+    return Response(status, body, comprimido, etag)
+
+
+# === Cache LRU em memória ===
+class LRUCache:
+    """Bounded LRU of parsed files and serialized responses.
+
+    Each entry remembers the (mtime, size) of the files it was built from and is
+    rebuilt as soon as one of them changes; the least recently used entries are
+    dropped past max_entries or max_bytes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, max_bytes=DEFAULT_CACHE_MB * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _signature(paths):
+        assinatura = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                assinatura.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                assinatura.append((path, None, None))
+        return tuple(assinatura)
+
+    def get(self, key, paths, build):
+        """Cached value of key, or build() → (value, size in bytes) when missing or stale."""
+        assinatura = self._signature(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == assinatura:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+        value, size = build()
+        with self._lock:
+            antiga = self._entries.pop(key, None)
+            if antiga is not None:
+                self._bytes -= antiga[2]
+            self._entries[key] = (assinatura, value, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, removido) = self._entries.popitem(last=False)
+                self._bytes -= removido
+                self.stats["evictions"] += 1
+        return value
+
+    def report(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes}
+
+
+# === Rotas (os mesmos parâmetros das rotas Next.js em app/api) ===
+class DataService:
+    def __init__(self, public_dir=DEFAULT_PUBLIC_DIR, cache=None):
+        self.public_dir = public_dir
+        self.cache = cache or LRUCache()
+
+    def _json_file(self, path):
+        def build():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f), os.path.getsize(path)
+        return self.cache.get(("json", path), [path], build)
+
+    def _cached(self, key, paths, build):
+        def build_response():
+            response = build()
+            return response, len(response.body) + len(response.gzip or b"")
+        return self.cache.get(key, paths, build_response)
+
+    def despesa(self, params):
+        year = params.get("year") or "2023"
+        sector = params.get("sector")
+        if not re.fullmatch(r"\d{4}", year):
+            return _response(400, {"error": f"Invalid year {year}"})
+        year_path = os.path.join(self.public_dir, "despesa", f"{year}.json")
+        if sector:
+            index_path = os.path.join(self.public_dir, "despesa", year, INDEX_NAME)
+            if os.path.exists(index_path):
+                index = self._json_file(index_path)
+                # Um índice sem o ano (ou sem a lista de setores) não tem shards para servir
+                setores = index.get(year) if isinstance(index, dict) else None
+                if not isinstance(setores, dict) or not isinstance(setores.get("setores"), list):
+                    return _response(404, {"error": f"No data available for year {year}"})
+                entry = next((s for s in setores["setores"] if s.get("sector") == sector), None)
+                if entry:
+                    shard_path = os.path.join(os.path.dirname(index_path), entry["shard"])
+
+                    def build_shard():
+                        with open(shard_path, "rb") as f:
+                            return _response(200, f.read())
+                    return self._cached(("despesa", year, sector), [index_path, shard_path], build_shard)
+
+        def build():
+            try:
+                data = self._json_file(year_path)
+            except (OSError, ValueError):
+                return _response(500, {"error": "Failed to load budget data"})
+            if not isinstance(data, dict) or not isinstance(data.get(year, {}), dict):
+                return _response(500, {"error": "Failed to load budget data"})
+            setores = data.get(year, {}).get("setores", {})
+            if sector and sector in setores:
+                return _response(200, {year: {"sector": sector, **setores[sector]}})
+            return _response(200, data)
+        return self._cached(("despesa", year, sector if sector else None), [year_path], build)
+
+    def transfers(self, params):
+        year = params.get("year") or "2023"
+        level = params.get("level") if params.get("level") in LEVELS else "district"
+        path = os.path.join(self.public_dir, "municipality_transfers", level, f"{year}.json")
+
+        def build():
+            if not re.fullmatch(r"\d{4}", year) or not os.path.exists(path):
+                return _response(404, {"error": f"No data available for year {year}"})
+            with open(path, "rb") as f:
+                return _response(200, f.read())
+        return self._cached(("transfers", year, level), [path], build)
+
+    def balance(self, params):
+        try:
+            start, end = int(params.get("startYear") or 2018), int(params.get("endYear") or 2023)
+        except ValueError:
+            return _response(500, {"error": "Failed to fetch balance data"})
+        paths = [os.path.join(self.public_dir, "balanco", f"{year}.json") for year in range(start, end + 1)]
+
+        def build():
+            data = {}
+            for year, path in zip(range(start, end + 1), paths):
+                try:
+                    data[str(year)] = self._json_file(path)
+                except (OSError, ValueError):
+                    continue
+            return _response(200, data)
+        return self._cached(("balance", start, end), paths, build)
+
+    ROUTES = {"/api/despesa": despesa, "/api/transfers": transfers, "/api/balance": balance}
+
+    def handle(self, path, query):
+        route = self.ROUTES.get(path.rstrip("/"))
+        if route is None:
+            # /api/arquivo é um proxy para o arquivo.pt, não um dataset local
+            return _response(404, {"error": "Not found"})
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        return route(self, params)
+
+
+# === HTTP ===
+def _accepts_gzip(header):
+    for parte in (header or "").split(","):
+        nome, _, resto = parte.strip().partition(";")
+        if nome.strip().lower() in ("gzip", "*"):
+            match = re.search(r"q\s*=\s*([0-9.]+)", resto)
+            return not match or float(match.group(1)) > 0
+    return False
+
+
+def _etag_matches(header, etags):
+    if not header:
+        return False
+    pedidos = {etag.strip().removeprefix("W/") for etag in header.split(",")}
+    return "*" in pedidos or bool(pedidos & etags)
+
+
+def make_handler(service, quiet=False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, with_body):
+            url = urlsplit(self.path)
+            response = service.handle(url.path, url.query)
+            usar_gzip = response.gzip is not None and _accepts_gzip(self.headers.get("Accept-Encoding"))
+            body = response.gzip if usar_gzip else response.body
+            etag = f'"{response.etag}-gz"' if usar_gzip else f'"{response.etag}"'
+
+            if response.status == 200 and _etag_matches(self.headers.get("If-None-Match"),
+                                                         {f'"{response.etag}"', f'"{response.etag}-gz"'}):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Vary", "Accept-Encoding")
+                self.end_headers()
+                return
+
+            self.send_response(response.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            if usar_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.end_headers()
+            if with_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._send(True)
+
+        def do_HEAD(self):
+            self._send(False)
+
+        def log_message(self, format, *args):
+            if not quiet:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve os dados extraídos com a mesma API das rotas Next.js (para dashboards e testes de carga).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--public-dir", default=DEFAULT_PUBLIC_DIR, help="pasta com despesa/, balanco/, municipality_transfers/")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES)
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_MB)
+    parser.add_argument("--quiet", action="store_true", help="não escreve uma linha por pedido")
+    args = parser.parse_args(argv)
+
+    service = DataService(args.public_dir, LRUCache(args.cache_entries, int(args.cache_mb * 2**20)))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, args.quiet))
+    print(f"🌐 http://{args.host}:{server.server_address[1]}/api/despesa|transfers|balance (Ctrl+C para parar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"cache: {service.cache.report()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import tempfile
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sheets")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Tipos de célula guardados em colunas "object" (texto e números misturados)
+_NAN, _NONE, _BOOL, _INT, _FLOAT, _STR, _DATETIME, _TIMESTAMP = range(8)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# === Codificação colunar de um DataFrame ===
+def _encode_cells(values):
+    """Splits a mixed object column into a kind array plus typed value arrays."""
+    n = len(values)
+    kinds = np.zeros(n, dtype=np.int8)
+    ints = np.zeros(n, dtype=np.int64)
+    floats = np.zeros(n, dtype=np.float64)
+    texts = [""] * n
+    for i, v in enumerate(values):
+        if v is None:
+            kinds[i] = _NONE
+        elif isinstance(v, (bool, np.bool_)):
+            kinds[i], ints[i] = _BOOL, int(v)
+        elif isinstance(v, (int, np.integer)):
+            kinds[i], ints[i] = _INT, int(v)
+        elif isinstance(v, (float, np.floating)):
+            if math.isnan(v):
+                kinds[i] = _NAN
+            else:
+                kinds[i], floats[i] = _FLOAT, float(v)
+        elif isinstance(v, str):
+            kinds[i], texts[i] = _STR, v
+        elif isinstance(v, pd.Timestamp):
+            kinds[i], texts[i] = _TIMESTAMP, v.isoformat()
+        elif isinstance(v, datetime.datetime):
+            kinds[i], texts[i] = _DATETIME, v.isoformat()
+        else:
+            raise TypeError(f"tipo de célula não suportado na cache: {type(v).__name__}")
+    return kinds, ints, floats, np.array(texts, dtype=str)
+
+
+def _decode_cells(kinds, ints, floats, texts):
+    values = np.empty(len(kinds), dtype=object)
+    for i, kind in enumerate(kinds):
+        if kind == _NAN:
+            values[i] = np.nan
+        elif kind == _NONE:
+            values[i] = None
+        elif kind == _BOOL:
+            values[i] = bool(ints[i])
+        elif kind == _INT:
+            values[i] = int(ints[i])
+        elif kind == _FLOAT:
+            values[i] = float(floats[i])
+        elif kind == _STR:
+            values[i] = str(texts[i])
+        elif kind == _TIMESTAMP:
+            values[i] = pd.Timestamp(texts[i])
+        else:
+            values[i] = datetime.datetime.fromisoformat(texts[i])
+    return values
+
+
+def _encode_frame(df):
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise TypeError("só DataFrames com índice 0..n-1 são guardados na cache")
+    arrays = {}
+    columns = []
+    for j in range(df.shape[1]):
+        col = df.iloc[:, j]
+        if col.dtype.kind in "biuf":
+            arrays[f"c{j}"] = col.to_numpy()
+            columns.append({"dtype": str(col.dtype), "native": True})
+        else:
+            kinds, ints, floats, texts = _encode_cells(col.astype(object).tolist())
+            arrays.update({f"c{j}k": kinds, f"c{j}i": ints, f"c{j}f": floats, f"c{j}s": texts})
+            columns.append({"dtype": str(col.dtype), "native": False})
+    kinds, ints, floats, texts = _encode_cells(list(df.columns))
+    arrays.update({"hk": kinds, "hi": ints, "hf": floats, "hs": texts})
+    meta = {"rows": len(df), "columns": columns, "columns_dtype": str(df.columns.dtype)}
+    arrays["meta"] = np.array(json.dumps(meta))
+    return arrays
+
+
+def _decode_frame(data):
+    meta = json.loads(str(data["meta"]))
+    series = {}
+    for j, col in enumerate(meta["columns"]):
+        if col["native"]:
+            series[j] = pd.Series(data[f"c{j}"], dtype=col["dtype"], copy=False)
+        else:
+            values = _decode_cells(data[f"c{j}k"], data[f"c{j}i"], data[f"c{j}f"], data[f"c{j}s"])
+            series[j] = pd.Series(values, dtype=object).astype(col["dtype"])
+    df = pd.DataFrame(series, index=pd.RangeIndex(meta["rows"]))
+    labels = _decode_cells(data["hk"], data["hi"], data["hf"], data["hs"])
+    df.columns = pd.Index(labels, dtype=meta["columns_dtype"])
+    return df
+
+
+# === Cache em disco com limite de tamanho ===
+class SheetCache:
+    """On-disk cache of decoded sheets keyed by (workbook SHA-256, sheet name, reader options).
+
+    Each sheet is one .npz file holding one typed array per column, named after its
+    workbook like the .json metadata of that workbook; the least recently used sheets
+    are evicted once the directory (metadata included) grows past max_bytes, and a
+    workbook's metadata goes with its last sheet.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, workbook_hash, sheet_name, options):
+        key = f"{workbook_hash}\0{sheet_name}\0{options}".encode("utf-8")
+        return os.path.join(self.directory, f"{workbook_hash}.{hashlib.sha256(key).hexdigest()}.npz")
+
+    def _json_path(self, workbook_hash, kind):
+        return os.path.join(self.directory, f"{workbook_hash}.{kind}.json")
+
+    def _write_atomic(self, path, write):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get(self, workbook_hash, sheet_name, options):
+        path = self._path(workbook_hash, sheet_name, options)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                df = _decode_frame(data)
+        except (OSError, ValueError, KeyError):
+            return None
+        # Marca o ficheiro como usado recentemente (ordem de despejo LRU)
+        os.utime(path)
+        return df
+
+    def put(self, workbook_hash, sheet_name, options, df):
+        try:
+            arrays = _encode_frame(df)
+        except TypeError:
+            return
+        path = self._path(workbook_hash, sheet_name, options)
+        self._write_atomic(path, lambda f: np.savez(f, **arrays))
+        self.evict()
+
+    def get_json(self, workbook_hash, kind):
+        """Small per-workbook metadata (sheet list, title index) stored next to the sheets."""
+        path = self._json_path(workbook_hash, kind)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return value
+
+    def put_json(self, workbook_hash, kind, value):
+        path = self._json_path(workbook_hash, kind)
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self._write_atomic(path, lambda f: f.write(payload))
+        self.evict()
+
+    def evict(self):
+        sheets = []
+        metadata = {}
+        remaining = Counter()
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                workbook = entry.name.split(".")[0]
+                if entry.name.endswith(".npz"):
+                    stat = entry.stat()
+                    sheets.append((stat.st_mtime, [(entry.path, stat.st_size)], workbook))
+                    remaining[workbook] += 1
+                elif entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    metadata.setdefault(workbook, []).append((stat.st_mtime, entry.path, stat.st_size))
+                else:
+                    continue
+                total += stat.st_size
+        # Metadados de um workbook sem folhas na cache são despejados por si, pelo mais recente deles
+        orfaos = [(max(mtime for mtime, _, _ in files), [], workbook)
+                  for workbook, files in metadata.items() if not remaining[workbook]]
+        for _, files, workbook in sorted(sheets + orfaos):
+            if total <= self.max_bytes:
+                break
+            remaining[workbook] -= 1
+            if remaining[workbook] <= 0:
+                # A última folha do workbook leva consigo a lista de folhas e o índice de títulos
+                files = files + [(path, size) for _, path, size in metadata.pop(workbook, [])]
+            for path, size in files:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+
+import openpyxl
+import xlrd
+
+
+# Padrões (sobre o título normalizado, sem "Quadro N –") dos quadros usados pelos scripts
+QUADROS = {
+    # Quadros azuis — "PO14 — Saúde: despesa por medidas do Programa"
+    "medidas_programa": r"^po\d+\b.*\bdespesas? por medidas?( d[oe] programa)?$",
+    # Quadro laranja — "Despesa (efetiva) consolidada da Administração Central por Programa Orçamental"
+    "despesa_por_programa": r"^despesa (efetiva )?consolidada da administracao central por programas? orcamenta(l|is)$",
+    # Balanço — "Conta consolidada das Administrações Públicas: 2015 (ótica de contas nacionais)"
+    "conta_ap_contas_nacionais": r"^conta consolidada das administracoes publicas\b.*\botica de contas nacionais$",
+    # Dívida — "Dívida pública: detalhe por instrumento"
+    "divida_por_instrumento": r"^divida publica detalhe por instrumento\b",
+}
+
+_PREFIXO_QUADRO = re.compile(r"^\s*quadro\s+(?:[a-z]+\s*)?\d+(?:\.\d+)*\.?\s*[–—:-]?\s*", re.IGNORECASE)
+
+
+def normalize_title(title):
+    """Case-, accent- and punctuation-insensitive form of a quadro title."""
+    text = unicodedata.normalize("NFKD", title)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text).split())
+
+
+def clean_title(raw):
+    """Strips the "QUADRO 124 –" / "Quadro 4.54." prefix and collapses whitespace."""
+    return " ".join(_PREFIXO_QUADRO.sub("", raw).split())
+
+
+def pick_title(candidates):
+    # B2 nos Quadros .xlsx (A1 tem "CGE2023"), A1 nos .xls; prefere a célula que começa por "Quadro"
+    textos = [str(c).strip() for c in candidates if isinstance(c, str) and c.strip()]
+    for texto in textos:
+        if texto.lower().startswith("quadro"):
+            return texto
+    return textos[0] if textos else None
+
+
+def scan_titles(path):
+    """Reads only the title cells (B2/A1) of every sheet; returns [(sheet name, title)] in sheet order."""
+    entries = []
+    if str(path).lower().endswith(".xls"):
+        book = xlrd.open_workbook(path, on_demand=True)
+        try:
+            for name in book.sheet_names():
+                sheet = book.sheet_by_name(name)
+                b2 = sheet.cell_value(1, 1) if sheet.nrows > 1 and sheet.ncols > 1 else None
+                a1 = sheet.cell_value(0, 0) if sheet.nrows and sheet.ncols else None
+                entries.append((name, pick_title([b2, a1])))
+                book.unload_sheet(name)
+        finally:
+            book.release_resources()
+    else:
+        book = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in book.worksheets:
+                rows = list(sheet.iter_rows(min_row=1, max_row=2, max_col=2, values_only=True))
+                a1 = rows[0][0] if rows and rows[0] else None
+                b2 = rows[1][1] if len(rows) > 1 and len(rows[1]) > 1 else None
+                entries.append((sheet.title, pick_title([b2, a1])))
+        finally:
+            book.close()
+    return [(name, clean_title(title)) for name, title in entries if title]
+
+
+# === Índice título → folha de um workbook ===
+class SheetIndex:
+    """Title → sheet-name map for one workbook, e.g.
+    "PO14 — Saúde: despesa por medidas do Programa" → "Quadro 4.54."."""
+
+    def __init__(self, entries):
+        self.entries = [(name, title) for name, title in entries]
+        self._normalized = [(name, normalize_title(title)) for name, title in self.entries]
+
+    @classmethod
+    def for_workbook(cls, workbook):
+        """Builds the index of a WorkbookSession, cached per workbook hash."""
+        cache = workbook.cache
+        entries = cache.get_json(workbook.hash, "titles") if cache else None
+        if entries is None:
+            entries = workbook.reader.titles(workbook.path)
+            if cache:
+                cache.put_json(workbook.hash, "titles", entries)
+        return cls(entries)
+
+    @property
+    def titles(self):
+        index = {}
+        for name, title in self.entries:
+            index.setdefault(title, name)
+        return index
+
+    def find(self, pattern):
+        """Sheet names, in workbook order, whose normalized title matches the regex pattern."""
+        regex = re.compile(QUADROS.get(pattern, pattern))
+        return [name for name, title in self._normalized if regex.search(title)]
+
+    def resolve(self, title):
+        """Sheet name of the quadro with the given title (accent/case/punctuation-insensitive)."""
+        wanted = normalize_title(clean_title(title))
+        for name, normalized in self._normalized:
+            if normalized == wanted:
+                return name
+        raise KeyError(f"nenhum quadro com o título {title!r}")
+
+
+def resolve_quadros(workbook, year, pinned, pattern, first=False):
+    """Pinned per-year sheet names win; any other year is resolved through the title index."""
+    if year in pinned:
+        return pinned[year]
+    sheets = workbook.index.find(pattern)
+    if not sheets:
+        raise KeyError(f"nenhum quadro de {workbook.path} corresponde a {pattern!r}")
+    return sheets[:1] if first else sheets
@@ -0,0 +1,201 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from workbook import DATA_DIR
+
+try:
+    import pyarrow  # noqa: F401 (motor do DataFrame.to_parquet)
+except ImportError:
+    pyarrow = None
+
+
+DEFAULT_SOURCE_DIR = os.path.dirname(DATA_DIR)
+DEFAULT_STORE_DIR = os.path.join(DATA_DIR, "store")
+SQLITE_NAME = "despesapublica.sqlite"
+
+# Índices da base SQLite (tabela → colunas)
+INDEXES = {
+    "despesa_medidas": ("year", "sector", "medida"),
+    "despesa_setores": ("year", "sector"),
+    "transferencias_municipios": ("year", "district", "municipality"),
+    "transferencias_distritos": ("year", "district"),
+}
+
+
+def _load_years(source_dir, dataset):
+    """{year: parsed JSON} of <source_dir>/<dataset>/YYYY.json, in year order."""
+    years = {}
+    for path in sorted(glob.glob(os.path.join(source_dir, dataset, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.isdigit():
+            with open(path, encoding="utf-8") as f:
+                years[int(name)] = json.load(f)
+    return years
+
+
+# === JSON por ano → tabelas em formato longo ===
+def despesa_tables(source_dir):
+    anos, setores, medidas = [], [], []
+    for year, data in _load_years(source_dir, "despesa").items():
+        totais = data[str(year)]
+        anos.append({
+            "year": year,
+            "despesa_orcamentada": totais.get("despesa_orcamentada"),
+            "despesa_executada_efetiva_consolidada": totais.get("despesa_executada_efetiva_consolidada"),
+            "grau_execucao": totais.get("grau_execução"),
+        })
+        for sector, valores in totais["setores"].items():
+            setores.append({
+                "year": year,
+                "sector": sector,
+                "despesa_orcamentada": valores.get("despesa_orcamentada"),
+                "despesa_executada_efetiva_consolidada": valores.get("despesa_executada_efetiva_consolidada"),
+                "despesa_executada_total_nao_consolidada": valores.get("despesa_executada_total_nao_consolidada"),
+                "grau_execucao": valores.get("grau_execução"),
+            })
+            for medida, valor in (valores.get("medidas") or {}).items():
+                medidas.append({"year": year, "sector": sector, "medida": medida, "valor": valor})
+    return {"despesa_anos": anos, "despesa_setores": setores, "despesa_medidas": medidas}
+
+
+def balanco_tables(source_dir):
+    rows = []
+    for year, data in _load_years(source_dir, "balanco").items():
+        for rubrica, valores in data.items():
+            rows.append({"year": year, "rubrica": rubrica,
+                         "executado": valores.get("Year"), "orcamentado": valores.get("Budget")})
+    return {"balanco": rows}
+
+
+def divida_tables(source_dir):
+    rows = []
+    for year, data in _load_years(source_dir, "divida").items():
+        rows.append({"year": year, "divida_milhoes_euros": data.get("Divida em milhões de euros"),
+                     "divida_percentagem_pib": data.get("Divida em %PIB")})
+    return {"divida": rows}
+
+
+def transferencias_tables(source_dir):
+    pais, distritos, municipios = [], [], []
+    for year, data in _load_years(source_dir, "municipality_transfers").items():
+        pais.append({"year": year, "total": data["Total"]})
+        for district in data["Districts"]:
+            distritos.append({"year": year, "district": district["District"], "gid": district.get("GID"),
+                              "total": district["Total"]})
+            ids = district.get("MunicipalityIds", {})
+            for municipality, total in district["Municipalities"].items():
+                municipios.append({"year": year, "district": district["District"], "municipality": municipality,
+                                   "gid": ids.get(municipality), "total": total})
+    return {"transferencias_pais": pais, "transferencias_distritos": distritos, "transferencias_municipios": municipios}
+
+
+TABLE_BUILDERS = [despesa_tables, balanco_tables, divida_tables, transferencias_tables]
+
+
+def build_tables(source_dir=DEFAULT_SOURCE_DIR):
+    """{table name: DataFrame} with every year of every dataset, one row per leaf value.
+
+    Datasets without any JSON in source_dir give no table.
+    """
+    tables = {}
+    for builder in TABLE_BUILDERS:
+        for name, rows in builder(source_dir).items():
+            if rows:
+                tables[name] = pd.DataFrame(rows)
+    return tables
+
+
+# === Escrita: parquet particionado e SQLite ===
+def write_parquet(tables, store_dir):
+    """<store_dir>/<table>/year=YYYY/part-0.parquet, each table replaced as a whole."""
+    for name, df in tables.items():
+        destino = os.path.join(store_dir, name)
+        tmp = tempfile.mkdtemp(dir=store_dir, prefix=f".{name}-")
+        try:
+            for year, part in df.groupby("year", sort=True):
+                # O ano fica no caminho (partição estilo hive), não dentro do ficheiro
+                folder = os.path.join(tmp, f"year={year}")
+                os.makedirs(folder)
+                part.drop(columns="year").to_parquet(os.path.join(folder, "part-0.parquet"), index=False)
+            shutil.rmtree(destino, ignore_errors=True)
+            os.replace(tmp, destino)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+
+def write_sqlite(tables, path):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".sqlite.tmp")
+    os.close(fd)
+    try:
+        with sqlite3.connect(tmp) as con:
+            for name, df in tables.items():
+                df.to_sql(name, con, index=False)
+            for name, columns in INDEXES.items():
+                if name in tables:
+                    con.execute(f"CREATE INDEX idx_{name}_{'_'.join(columns)} ON {name} ({', '.join(columns)})")
+        con.close()
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def export(source_dir=DEFAULT_SOURCE_DIR, store_dir=DEFAULT_STORE_DIR, parquet=True):
+    """Writes the consolidated store; returns {table: rows}."""
+    os.makedirs(store_dir, exist_ok=True)
+    tables = build_tables(source_dir)
+    if parquet:
+        if pyarrow is None:
+            print("⚠️ pyarrow não está instalado: só a base SQLite é escrita (pip install pyarrow)")
+        else:
+            write_parquet(tables, store_dir)
+    write_sqlite(tables, os.path.join(store_dir, SQLITE_NAME))
+    return {name: len(df) for name, df in tables.items()}
+
+
+def query(sql, store_dir=DEFAULT_STORE_DIR, params=()):
+    """Runs sql against the store's SQLite database, e.g.
+
+    SELECT year, medida, valor FROM despesa_medidas
+    WHERE sector = 'Saúde' AND year BETWEEN 2015 AND 2023 ORDER BY year
+    """
+    with sqlite3.connect(os.path.join(store_dir, SQLITE_NAME)) as con:
+        df = pd.read_sql_query(sql, con, params=params)
+    con.close()
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Junta todos os anos e datasets num parquet particionado e numa base SQLite.")
+    parser.add_argument("--source-dir", default=DEFAULT_SOURCE_DIR, help="pasta com despesa/, balanco/, divida/, ...")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--no-parquet", action="store_true", help="escreve só a base SQLite")
+    parser.add_argument("--query", default=None, help="em vez de exportar, corre esta consulta SQL na base")
+    args = parser.parse_args(argv)
+
+    if args.query:
+        inicio = time.perf_counter()
+        print(query(args.query, args.store_dir).to_string(index=False))
+        print(f"\n({time.perf_counter() - inicio:.3f}s)")
+        return 0
+
+    inicio = time.perf_counter()
+    counts = export(args.source_dir, args.store_dir, parquet=not args.no_parquet)
+    for name, rows in counts.items():
+        print(f"✓ {name:<28} {rows:>6} linhas")
+    print(f"\n📦 store em {args.store_dir} ({time.perf_counter() - inicio:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import script_efet_atual_2015
+from extracao import numeros_pt
+
+
+def _quadro_2015(valores):
+    # Quadro azul de 2015: nomes na coluna 0, valores na coluna 2
+    nomes = ["Estado, SFA e EPR", *[f"M{i:03d} - Medida {i}" for i in range(len(valores))], "DESPESA TOTAL CONSOLIDADA"]
+    return pd.DataFrame({"a": nomes, "b": np.nan, "c": [np.nan, *valores, 1.0]})
+
+
+def test_numeros_pt_keeps_floats():
+    assert numeros_pt([0.125, 2.25, 12.345]).tolist() == [0.125, 2.25, 12.345]
+
+
+def test_numeros_pt_text_in_pt_format():
+    assert numeros_pt(["1.234,5", "1 234", "-"]).tolist() == [1234.5, 1234.0, 0.0]
+    assert numeros_pt(["259.1", "12.5"]).tolist() == [259.1, 12.5]
+
+
+def test_2015_medidas_with_three_decimals_are_not_scaled():
+    # Valores com três casas decimais eram lidos como milhares (0.125 → 125) quando a coluna vinha como texto
+    medidas = script_efet_atual_2015.extrair_medidas_quadro("Quadro 124", _quadro_2015([0.125, 2.25, 12.345]))
+    assert list(medidas.values()) == [0.125, 2.25, 12.345]
+
+
+def test_2015_medidas_empty_cells_count_as_zero():
+    medidas = script_efet_atual_2015.extrair_medidas_quadro("Quadro 124", _quadro_2015([np.nan, 3.5]))
+    assert list(medidas.values()) == [0.0, 3.5]
+    assert not any(math.isnan(valor) for valor in medidas.values())
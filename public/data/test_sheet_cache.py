@@ -0,0 +1,27 @@
+import os
+
+import pandas as pd
+
+from sheet_cache import SheetCache
+
+
+def _set_mtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def test_metadata_counts_towards_the_limit_and_goes_with_the_last_sheet(tmp_path):
+    cache = SheetCache(str(tmp_path), max_bytes=10**9)
+    df = pd.DataFrame({"a": [1.0, 2.0], "b": ["x", "y"]})
+    cache.put("antigo", "Quadro 1", "", df)
+    cache.put("antigo", "Quadro 2", "", df)
+    cache.put_json("antigo", "sheets", ["Quadro 1", "Quadro 2"] * 1000)
+    cache.put("recente", "Quadro 1", "", df)
+    for i, name in enumerate(sorted(os.listdir(tmp_path))):
+        _set_mtime(os.path.join(tmp_path, name), 1000 + (i if name.startswith("antigo") else 100))
+
+    # Só os metadados já passam o limite: as folhas do workbook antigo saem, e com elas o .json
+    cache.max_bytes = os.path.getsize(tmp_path / "antigo.sheets.json")
+    cache.evict()
+    assert sorted(name.split(".")[0] for name in os.listdir(tmp_path)) == ["recente"]
+    assert cache.get_json("antigo", "sheets") is None
+    assert cache.get("recente", "Quadro 1", "").equals(df)
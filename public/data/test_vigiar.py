@@ -0,0 +1,50 @@
+import os
+import shutil
+
+import vigiar
+from batch import PUBLIC_DIR
+from workbook import DATA_DIR
+
+
+def _conteudo(directory):
+    ficheiros = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            with open(os.path.join(root, name), "rb") as f:
+                ficheiros[os.path.relpath(os.path.join(root, name), directory)] = f.read()
+    return ficheiros
+
+
+def test_touching_a_committed_workbook_keeps_the_curated_outputs(tmp_path, capsys):
+    output_dir = tmp_path / "public"
+    for dataset in ("balanco", "divida"):
+        shutil.copytree(os.path.join(PUBLIC_DIR, dataset), output_dir / dataset)
+    antes = _conteudo(output_dir)
+
+    workbook = os.path.join(DATA_DIR, "Quadros_2013.xls")
+    stat = os.stat(workbook)
+    watcher = vigiar.Watcher(DATA_DIR, settle=0, output_dir=str(output_dir),
+                             manifest_path=str(tmp_path / "build-manifest.json"), workers=1)
+    try:
+        os.utime(workbook)
+        # O primeiro poll vê a mudança, o segundo confirma que o ficheiro assentou
+        watcher.poll()
+        assert ("Quadros", 2013) in watcher.poll()
+    finally:
+        watcher.close()
+        os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert "🔒 divida:2013" in capsys.readouterr().out
+    assert _conteudo(output_dir) == antes
+
+
+def test_extract_publishes_a_year_without_curated_output(tmp_path):
+    output_dir = tmp_path / "public"
+    output_dir.mkdir()
+    report = vigiar.extract(2013, ["divida"], str(output_dir), str(tmp_path / "build-manifest.json"), workers=1)
+    assert report["divida"][0] == "ok"
+    assert os.path.exists(output_dir / "divida" / "2013.json")
+
+    # Escrito pela build e registado no manifesto: já não conta como curado
+    report = vigiar.extract(2013, ["divida"], str(output_dir), str(tmp_path / "build-manifest.json"), workers=1)
+    assert report == {}
@@ -0,0 +1,299 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+
+import numpy as np
+
+from gadm_ids import GidIndex
+from saida import UNIDADES, quantize
+from workbook import DATA_DIR
+
+
+PUBLIC_DIR = os.path.dirname(DATA_DIR)
+DEFAULT_TRANSFERS_DIR = os.path.join(PUBLIC_DIR, "municipality_transfers")
+
+# Nível GADM → (ficheiro GeoJSON original, tolerância de simplificação por omissão, em graus)
+LEVELS = {
+    1: ("gadm41_PRT_1.json", 0.002),
+    2: ("gadm41_PRT_2.json", 0.001),
+}
+DEFAULT_QUANTIZATION = 100_000
+
+
+# === Quantização e construção da topologia ===
+def _rings(geometry):
+    """Polygons of a Polygon/MultiPolygon geometry as lists of rings (lists of [x, y])."""
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    raise ValueError(f"geometria não suportada: {geometry['type']}")
+
+
+def _quantize_ring(ring, translate, scale):
+    pontos = np.rint((np.asarray(ring, dtype=float)[:, :2] - translate) / scale).astype(np.int64)
+    # Pontos seguidos iguais depois de quantizar não acrescentam nada
+    manter = np.ones(len(pontos), dtype=bool)
+    manter[1:] = np.any(pontos[1:] != pontos[:-1], axis=1)
+    pontos = [tuple(p) for p in pontos[manter].tolist()]
+    if len(pontos) > 1 and pontos[0] == pontos[-1]:
+        pontos.pop()
+    return pontos
+
+
+def _junctions(rings):
+    """Points where two rings stop sharing their boundary (different neighbours on each visit)."""
+    vizinhos = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring)
+        for i, ponto in enumerate(ring):
+            par = (ring[i - 1], ring[(i + 1) % n])
+            visto = vizinhos.setdefault(ponto, par)
+            if visto != par and visto != par[::-1]:
+                junctions.add(ponto)
+    return junctions
+
+
+class _Arcs:
+    """Deduplicated arcs; an arc used backwards is referenced as ~index, as in TopoJSON."""
+
+    def __init__(self):
+        self.arcs = []
+        self._index = {}
+
+    def add(self, pontos):
+        chave = tuple(pontos)
+        if chave in self._index:
+            return self._index[chave]
+        inverso = chave[::-1]
+        if inverso in self._index:
+            return ~self._index[inverso]
+        self.arcs.append(list(pontos))
+        self._index[chave] = len(self.arcs) - 1
+        return len(self.arcs) - 1
+
+    def add_ring(self, ring):
+        # Anel sem junções: um só arco fechado, que começa no menor ponto para anéis iguais coincidirem
+        inicio = ring.index(min(ring))
+        frente = ring[inicio:] + ring[:inicio]
+        inverso = frente[:1] + frente[:0:-1]
+        for candidato, sinal in ((frente, False), (inverso, True)):
+            chave = tuple(candidato + candidato[:1])
+            if chave in self._index:
+                return ~self._index[chave] if sinal else self._index[chave]
+        return self.add(frente + frente[:1])
+
+
+def _cut_ring(ring, junctions, arcs):
+    posicoes = [i for i, ponto in enumerate(ring) if ponto in junctions]
+    if not posicoes:
+        return [arcs.add_ring(ring)]
+    inicio = posicoes[0]
+    rodado = ring[inicio:] + ring[:inicio] + ring[inicio:inicio + 1]
+    cortes = [i for i, ponto in enumerate(rodado) if ponto in junctions]
+    return [arcs.add(rodado[a:b + 1]) for a, b in zip(cortes, cortes[1:])]
+
+
+# === Simplificação (Douglas–Peucker por arco, extremos fixos) ===
+def _douglas_peucker(pontos, tolerancia):
+    if len(pontos) <= 2 or tolerancia <= 0:
+        return pontos
+    coords = np.asarray(pontos, dtype=float)
+    manter = np.zeros(len(coords), dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, len(coords) - 1)]
+    while pilha:
+        a, b = pilha.pop()
+        if b - a < 2:
+            continue
+        segmento = coords[b] - coords[a]
+        relativos = coords[a + 1:b] - coords[a]
+        comprimento = np.hypot(*segmento)
+        if comprimento == 0:
+            distancias = np.hypot(relativos[:, 0], relativos[:, 1])
+        else:
+            distancias = np.abs(segmento[0] * relativos[:, 1] - segmento[1] * relativos[:, 0]) / comprimento
+        i = int(np.argmax(distancias))
+        if distancias[i] > tolerancia:
+            meio = a + 1 + i
+            manter[meio] = True
+            pilha.extend([(a, meio), (meio, b)])
+    return [p for p, m in zip(pontos, manter) if m]
+
+
+def _ring_size(ring_arcs, arcs):
+    return sum(len(arcs[i if i >= 0 else ~i]) - 1 for i in ring_arcs)
+
+
+def simplify(arcs, rings, tolerancia):
+    """Simplified copy of arcs; arcs of any ring that would collapse (< 4 points) are kept whole."""
+    simplificados = [_douglas_peucker(arc, tolerancia) for arc in arcs]
+    for ring_arcs in rings:
+        if _ring_size(ring_arcs, simplificados) < 3:
+            for i in ring_arcs:
+                j = i if i >= 0 else ~i
+                simplificados[j] = arcs[j]
+    return simplificados
+
+
+def _delta(arc):
+    coords = np.asarray(arc, dtype=np.int64)
+    coords[1:] = coords[1:] - coords[:-1]
+    return coords.tolist()
+
+
+# === GeoJSON → TopoJSON ===
+def to_topology(geojson, object_name, tolerancia=0.0, quantization=DEFAULT_QUANTIZATION, properties=None):
+    """Quantized, delta-encoded TopoJSON of a Polygon/MultiPolygon FeatureCollection.
+
+    Shared borders become one arc, simplified once (tolerancia in the input units),
+    so neighbouring features stay glued together. properties(feature) gives each
+    geometry's properties (the feature's own by default).
+    """
+    features = geojson["features"]
+    todos = np.concatenate([np.asarray(ring, dtype=float)[:, :2]
+                            for f in features for polygon in _rings(f["geometry"]) for ring in polygon])
+    x0, y0 = todos.min(axis=0)
+    x1, y1 = todos.max(axis=0)
+    translate = np.array([x0, y0])
+    scale = np.array([(x1 - x0) / (quantization - 1) or 1.0, (y1 - y0) / (quantization - 1) or 1.0])
+
+    poligonos = [[[_quantize_ring(ring, translate, scale) for ring in polygon] for polygon in _rings(f["geometry"])]
+                 for f in features]
+    rings = [ring for feature in poligonos for polygon in feature for ring in polygon if len(ring) >= 3]
+    junctions = _junctions(rings)
+
+    arcs = _Arcs()
+    geometries, todos_aneis = [], []
+    for feature, poligonos_feature in zip(features, poligonos):
+        polygons = []
+        for polygon in poligonos_feature:
+            aneis = [_cut_ring(ring, junctions, arcs) for ring in polygon if len(ring) >= 3]
+            if aneis:
+                polygons.append(aneis)
+                todos_aneis.extend(aneis)
+        geometry = {"type": "Polygon", "arcs": polygons[0]} if len(polygons) == 1 else {"type": "MultiPolygon", "arcs": polygons}
+        geometry["properties"] = properties(feature) if properties else feature.get("properties", {})
+        geometries.append(geometry)
+
+    tolerancia_q = tolerancia / float(min(scale))
+    simplificados = simplify(arcs.arcs, todos_aneis, tolerancia_q)
+    return {
+        "type": "Topology",
+        "bbox": [float(x0), float(y0), float(x1), float(y1)],
+        "transform": {"scale": scale.tolist(), "translate": translate.tolist()},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": [_delta(arc) for arc in simplificados],
+    }
+
+
+# === Transferências por ano como propriedades ===
+def load_transfers(transfers_dir=DEFAULT_TRANSFERS_DIR):
+    """{year: municipality_transfers JSON} for every YYYY.json in transfers_dir."""
+    anos = {}
+    for path in sorted(glob.glob(os.path.join(transfers_dir, "*.json"))):
+        nome = os.path.splitext(os.path.basename(path))[0]
+        if nome.isdigit():
+            with open(path, encoding="utf-8") as f:
+                anos[int(nome)] = json.load(f)
+    return anos
+
+
+def transfer_totals(anos, ids=None):
+    """({GID_1: {year: total}}, {GID_2: {year: total}}), from the GIDs each year carries;
+    years extracted without them are resolved through the GADM index."""
+    ids = ids or GidIndex.load()
+    distritos, municipios = {}, {}
+    for year, data in anos.items():
+        for district in data["Districts"]:
+            gid = district.get("GID") or ids.district(district["District"])
+            distritos.setdefault(gid, {})[str(year)] = district["Total"]
+            municipality_ids = district.get("MunicipalityIds", {})
+            for nome, total in district["Municipalities"].items():
+                gid = municipality_ids.get(nome) or ids.municipality(district["District"], nome)
+                municipios.setdefault(gid, {})[str(year)] = total
+    return distritos, municipios
+
+
+def feature_properties(level, anos, distritos, municipios, unmatched):
+    """Properties builder for to_topology: GADM properties without "NA" values, plus
+    "transfers" {year: total in euros, to the cent, or null} for every year in anos."""
+    anos = [str(year) for year in sorted(anos)]
+
+    def properties(feature):
+        props = {k: v for k, v in feature["properties"].items() if v != "NA"}
+        totais = (distritos if level == 1 else municipios).get(props[f"GID_{level}"])
+        if totais is None:
+            unmatched.append(props.get(f"NAME_{level}"))
+            totais = {}
+        props["transfers"] = quantize({year: totais.get(year) for year in anos}, UNIDADES["municipality_transfers"])
+        return props
+
+    return properties
+
+
+def build(levels=(1, 2), tolerances=None, quantization=DEFAULT_QUANTIZATION, public_dir=PUBLIC_DIR,
+          transfers_dir=DEFAULT_TRANSFERS_DIR):
+    """Writes <public_dir>/gadm41_PRT_<level>.topo.json; returns one size-report row per level."""
+    tolerances = tolerances or {}
+    anos = load_transfers(transfers_dir)
+    distritos, municipios = transfer_totals(anos)
+    report = []
+    for level in levels:
+        ficheiro, tolerancia = LEVELS[level]
+        tolerancia = tolerances.get(level, tolerancia)
+        origem = os.path.join(public_dir, ficheiro)
+        with open(origem, encoding="utf-8") as f:
+            geojson = json.load(f)
+        unmatched = []
+        nome = os.path.splitext(ficheiro)[0]
+        topology = to_topology(geojson, nome, tolerancia, quantization,
+                               feature_properties(level, anos, distritos, municipios, unmatched))
+        payload = json.dumps(topology, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        destino = os.path.join(public_dir, f"{nome}.topo.json")
+        with open(destino, "wb") as f:
+            f.write(payload)
+        with open(origem, "rb") as f:
+            original = f.read()
+        report.append({
+            "level": level,
+            "output": destino,
+            "tolerance": tolerancia,
+            "features": len(geojson["features"]),
+            "arcs": len(topology["arcs"]),
+            "points": sum(len(arc) for arc in topology["arcs"]),
+            "original_bytes": len(original),
+            "original_gzip_bytes": len(gzip.compress(original, mtime=0)),
+            "bytes": len(payload),
+            "gzip_bytes": len(gzip.compress(payload, mtime=0)),
+            "unmatched": unmatched,
+        })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera TopoJSON simplificado e quantizado dos mapas GADM, com as transferências por ano.")
+    parser.add_argument("--levels", nargs="+", type=int, choices=sorted(LEVELS), default=sorted(LEVELS))
+    parser.add_argument("--tolerance-1", type=float, default=LEVELS[1][1], help="tolerância dos distritos, em graus")
+    parser.add_argument("--tolerance-2", type=float, default=LEVELS[2][1], help="tolerância dos municípios, em graus")
+    parser.add_argument("--quantization", type=int, default=DEFAULT_QUANTIZATION)
+    args = parser.parse_args(argv)
+
+    report = build(args.levels, {1: args.tolerance_1, 2: args.tolerance_2}, args.quantization)
+    for row in report:
+        print(f"✓ {os.path.basename(row['output'])}: {row['features']} features, {row['arcs']} arcos, {row['points']} pontos "
+              f"(tolerância {row['tolerance']}°)")
+        print(f"  {row['original_bytes'] / 1024:.0f} KB → {row['bytes'] / 1024:.0f} KB "
+              f"({row['bytes'] / row['original_bytes']:.0%}); gzip {row['original_gzip_bytes'] / 1024:.0f} KB → "
+              f"{row['gzip_bytes'] / 1024:.0f} KB")
+        if row["unmatched"]:
+            print(f"  ⚠️ sem transferências: {', '.join(sorted(set(row['unmatched'])))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
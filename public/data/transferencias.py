@@ -0,0 +1,113 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+
+from saida import escrever_json
+from workbook import DATA_DIR
+
+
+DEFAULT_TRANSFERS_DIR = os.path.join(os.path.dirname(DATA_DIR), "municipality_transfers")
+
+# Subpastas com as vistas servidas por /api/transfers?level=...
+LEVELS = ("district", "municipality")
+
+
+def _percentagem(parte, total):
+    if parte is None or not total:
+        return None
+    return parte / total * 100
+
+
+def js_number_string(value):
+    """value.toString() as JavaScript prints it (the API has always sent NationalPercentage as a string)."""
+    if value is None or math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    texto = repr(value)
+    if "e" not in texto:
+        return texto
+    mantissa, expoente = texto.split("e")
+    expoente = int(expoente)
+    if expoente >= -6:
+        # O Python passa a notação científica abaixo de 1e-4, o JavaScript só abaixo de 1e-6
+        sinal = "-" if mantissa.startswith("-") else ""
+        digitos = mantissa.lstrip("-").replace(".", "")
+        return f"{sinal}0.{'0' * (-expoente - 1)}{digitos}"
+    return f"{mantissa}e{expoente}"
+
+
+# === Vistas pré-calculadas ===
+def district_view(data):
+    """Country totals plus, per district, its total and share of the national total."""
+    return {
+        "Country": data["Country"],
+        "Year": data["Year"],
+        "Total": data["Total"],
+        "Districts": [
+            {
+                "District": district["District"],
+                "GID": district.get("GID"),
+                "Total": district["Total"],
+                "NationalPercentage": js_number_string(_percentagem(district["Total"], data["Total"])),
+            }
+            for district in data["Districts"]
+        ],
+    }
+
+
+def municipality_view(data):
+    """Full data; each district also gets NationalPercentage and each municipality its share
+    of the district (DistrictPercentage) and of the country (NationalPercentage)."""
+    districts = []
+    for district in data["Districts"]:
+        shares = {
+            name: {
+                "DistrictPercentage": _percentagem(total, district["Total"]),
+                "NationalPercentage": _percentagem(total, data["Total"]),
+            }
+            for name, total in district["Municipalities"].items()
+        }
+        districts.append({
+            **district,
+            "NationalPercentage": js_number_string(_percentagem(district["Total"], data["Total"])),
+            "MunicipalityShares": shares,
+        })
+    return {**data, "Districts": districts}
+
+
+def write_views(data, output_path, saida=None):
+    """Writes district/YYYY.json and municipality/YYYY.json next to output_path, minified
+    like the responses /api/transfers used to build; returns every path written."""
+    folder, name = os.path.split(output_path)
+    written = []
+    for level, view in (("district", district_view), ("municipality", municipality_view)):
+        path = os.path.join(folder, level, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        written += escrever_json(view(data), path, "municipality_transfers", saida, ensure_ascii=False, separators=(",", ":"))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenera as vistas por distrito e por município a partir de municipality_transfers/YYYY.json.")
+    parser.add_argument("--dir", default=DEFAULT_TRANSFERS_DIR)
+    args = parser.parse_args(argv)
+
+    for path in sorted(glob.glob(os.path.join(args.dir, "*.json"))):
+        if not os.path.splitext(os.path.basename(path))[0].isdigit():
+            continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for view_path in write_views(data, path):
+            if view_path.endswith(".json"):
+                print(f"✓ {os.path.relpath(view_path, args.dir)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
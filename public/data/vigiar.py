@@ -0,0 +1,243 @@
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import hashed_outputs
+import series
+from batch import DATASETS, PUBLIC_DIR, build_jobs, is_curated, run_jobs
+from build_manifest import MANIFEST_PATH, BuildManifest
+from readers import DEFAULT_READER, READERS
+from workbook import DATA_DIR
+
+
+# Quadros_2024.xlsx, Mapas_2024.xls, Mapas_pdf_2014.pdf (não apanha os "~$Quadros..." do Excel)
+FICHEIRO = re.compile(r"^(?P<prefix>Quadros|Mapas)(?:_pdf)?_(?P<year>\d{4})\.(?:xlsx|xls|pdf)$")
+DEFAULT_INTERVAL = 1.0
+# Segundos sem mudanças de tamanho/mtime até um ficheiro contar como completamente escrito
+DEFAULT_SETTLE = 2.0
+
+
+def snapshot(directory=DATA_DIR):
+    """{file name: (size, mtime_ns)} of the Quadros_* / Mapas_* inputs in directory."""
+    ficheiros = {}
+    for entry in os.scandir(directory):
+        if entry.is_file() and FICHEIRO.match(entry.name):
+            stat = entry.stat()
+            ficheiros[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return ficheiros
+
+
+# === Debounce das escritas parciais ===
+class Debouncer:
+    """Reports a file once its (size, mtime) has stayed the same for `settle` seconds.
+
+    A workbook being copied in changes on every poll, so it is only reported after the
+    copy ends; a file that changes again later is reported again.
+    """
+
+    def __init__(self, settle=DEFAULT_SETTLE, initial=None):
+        self.settle = settle
+        self.published = dict(initial or {})
+        self.pending = {}
+
+    def update(self, ficheiros, now=None):
+        now = time.monotonic() if now is None else now
+        prontos = []
+        for name, assinatura in ficheiros.items():
+            if self.published.get(name) == assinatura:
+                self.pending.pop(name, None)
+                continue
+            anterior = self.pending.get(name)
+            if anterior is None or anterior[0] != assinatura:
+                self.pending[name] = (assinatura, now)
+            elif now - anterior[1] >= self.settle:
+                del self.pending[name]
+                self.published[name] = assinatura
+                prontos.append(name)
+        for name in set(self.pending) - set(ficheiros):
+            del self.pending[name]
+        return prontos
+
+
+# === Publicação atómica ===
+def publish(staging, output_dir, folder):
+    """Moves staging/<folder> into output_dir/<folder>, one os.replace per file.
+
+    Inner folders go first and each folder's index.json last, so a reader never sees
+    an index pointing at a shard that is not there yet. Compressed siblings and shard
+    files the new build no longer has are removed afterwards. Returns the published paths.
+    """
+    publicados = []
+    origem = os.path.join(staging, folder)
+    for root, _, files in os.walk(origem, topdown=False):
+        destino = os.path.join(output_dir, os.path.relpath(root, staging))
+        os.makedirs(destino, exist_ok=True)
+        for name in sorted(files, key=lambda name: (name.startswith("index."), name)):
+            os.replace(os.path.join(root, name), os.path.join(destino, name))
+            publicados.append(os.path.join(destino, name))
+        if re.fullmatch(r"\d{4}", os.path.basename(root)):
+            # Pasta de shards de um ano: o que não veio nesta build já não existe
+            for antigo in set(os.listdir(destino)) - set(files):
+                if os.path.isfile(os.path.join(destino, antigo)) and not hashed_outputs.is_hashed(antigo):
+                    os.unlink(os.path.join(destino, antigo))
+        for name in files:
+            for sibling in (f"{name}.gz", f"{name}.br"):
+                if sibling not in files and os.path.exists(os.path.join(destino, sibling)):
+                    os.unlink(os.path.join(destino, sibling))
+    return publicados
+
+
+def datasets_for(prefix):
+    return [dataset for dataset, (dataset_prefix, _) in DATASETS.items() if dataset_prefix == prefix]
+
+
+def extract(year, datasets, output_dir=PUBLIC_DIR, manifest_path=MANIFEST_PATH, leitura=None, saida=None,
+            workers=None, with_series=False, force=False, hashed=False):
+    """Rebuilds the outputs of datasets for year that are out of date, in a staging folder,
+    and publishes each dataset atomically once its extraction succeeded.
+    Curated outputs (see batch.is_curated) are never replaced unless force: only years
+    the site has no curated data for, or that earlier builds wrote, get published.
+    With hashed the content-hashed copies and data-manifest.json are refreshed after
+    that (see hashed_outputs.py).
+
+    Returns {dataset: (status, seconds, published paths or error)}.
+    """
+    manifest = BuildManifest(manifest_path) if manifest_path else None
+    report = {}
+    if not force:
+        for dataset in datasets:
+            if is_curated(os.path.join(output_dir, dataset, f"{year}.json"), manifest):
+                report[dataset] = ("protected", 0.0, "output curado, não substituído")
+        datasets = [dataset for dataset in datasets if dataset not in report]
+    _, _, plan = build_jobs([year], datasets, output_dir, manifest=manifest, force=force, saida=saida)
+    if manifest is not None:
+        datasets = [name.split(":")[0] for name, (_, _, reasons) in plan.items() if reasons]
+    if not datasets:
+        return report
+
+    staging = tempfile.mkdtemp(dir=output_dir, prefix=".vigiar-")
+    try:
+        jobs, _, _ = build_jobs([year], datasets, staging, leitura=leitura, saida=saida)
+        results = run_jobs(jobs, workers) if jobs else {}
+        for dataset in datasets:
+            name = f"{dataset}:{year}"
+            if name not in results:
+                continue
+            status, elapsed, detail = results[name]
+            if status == "ok":
+                # A tarefa devolve os ficheiros que escreveu no staging; no manifesto ficam os publicados
+                escritos = [os.path.join(output_dir, os.path.relpath(path, staging)) for path in detail[0]]
+                detail = publish(staging, output_dir, dataset)
+                if manifest is not None and name in plan:
+                    output_path, fingerprint, _ = plan[name]
+                    manifest.record(output_path, fingerprint, escritos)
+            report[dataset] = (status, elapsed, detail)
+        if manifest is not None:
+            manifest.save()
+        if with_series and any(status == "ok" for status, _, _ in report.values()):
+            series.write_series(output_dir, os.path.join(staging, "series"), saida)
+            publish(staging, output_dir, "series")
+        if hashed and any(status == "ok" for status, _, _ in report.values()):
+            hashed_outputs.publish(output_dir)
+        return report
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+# === Ciclo de vigilância ===
+class Watcher:
+    """Polls directory and extracts, in a background thread, the year of every
+    Quadros_* / Mapas_* file that settled; the years queue up one at a time."""
+
+    def __init__(self, directory=DATA_DIR, settle=DEFAULT_SETTLE, initial=False, **extract_options):
+        self.directory = directory
+        self.debouncer = Debouncer(settle, None if initial else snapshot(directory))
+        self.extract_options = extract_options
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._queued = set()
+
+    def poll(self):
+        """Checks the directory once; returns the (prefix, year) extractions it queued."""
+        novos = []
+        for name in self.debouncer.update(snapshot(self.directory)):
+            match = FICHEIRO.match(name)
+            alvo = (match["prefix"], int(match["year"]))
+            with self._lock:
+                if alvo in self._queued:
+                    continue
+                self._queued.add(alvo)
+            print(f"📥 {name} pronto: a extrair {alvo[0]} {alvo[1]}")
+            self._pool.submit(self._run, *alvo)
+            novos.append(alvo)
+        return novos
+
+    def _run(self, prefix, year):
+        with self._lock:
+            self._queued.discard((prefix, year))
+        inicio = time.perf_counter()
+        try:
+            report = extract(year, datasets_for(prefix), **self.extract_options)
+        except Exception as e:
+            print(f"✗ {prefix} {year}: {e}")
+            return
+        if not report:
+            print(f"= {prefix} {year}: outputs já atualizados")
+        for dataset, (status, elapsed, detail) in report.items():
+            if status == "ok":
+                print(f"✓ {dataset}:{year} publicado ({len(detail)} ficheiro(s), {elapsed:.2f}s)")
+            elif status == "protected":
+                print(f"🔒 {dataset}:{year} {detail} (--force para substituir)")
+            else:
+                print(f"✗ {dataset}:{year} {status}: {detail}")
+        print(f"⏱ {prefix} {year} em {time.perf_counter() - inicio:.2f}s")
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Vigia public/data e extrai automaticamente o ano de cada Quadros_* / Mapas_* novo ou alterado.")
+    parser.add_argument("--output-dir", default=PUBLIC_DIR, help="pasta com despesa/, balanco/, ...")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="segundos entre verificações")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help="segundos sem mudanças até um ficheiro contar como completo")
+    parser.add_argument("--initial", action="store_true",
+                        help="trata também os ficheiros que já lá estão (só reconstrói o que estiver desatualizado)")
+    parser.add_argument("--workers", type=int, default=None, help="processos por extração (por omissão, um por core)")
+    parser.add_argument("--reader", choices=sorted(READERS), default=DEFAULT_READER,
+                        help="backend de leitura dos workbooks (ver readers.py)")
+    parser.add_argument("--series", action="store_true", help="reescreve também as séries temporais a cada ano publicado")
+    parser.add_argument("--hashed", action="store_true",
+                        help="atualiza também as cópias com hash no nome e o data-manifest.json (ver hashed_outputs.py)")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="manifesto da build incremental")
+    parser.add_argument("--no-manifest", action="store_true", help="reconstrói sempre os datasets do ano")
+    parser.add_argument("--force", action="store_true",
+                        help="substitui também os outputs curados, que nenhuma build registou (ver batch.py --publish)")
+    args = parser.parse_args(argv)
+
+    leitura = {"reader": args.reader} if args.reader != DEFAULT_READER else None
+    watcher = Watcher(DATA_DIR, args.settle, args.initial, output_dir=args.output_dir,
+                      manifest_path=None if args.no_manifest else args.manifest, leitura=leitura,
+                      workers=args.workers, with_series=args.series, force=args.force, hashed=args.hashed)
+    print(f"👀 a vigiar {DATA_DIR} (Ctrl+C para parar)")
+    try:
+        while True:
+            watcher.poll()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+import contextlib
+import logging
+import os
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from layouts import expand, read_options
+from perfil import PERFIL
+from readers import DEFAULT_READER, READERS, get_reader
+from sheet_cache import SheetCache, file_sha256
+from sheet_index import SheetIndex
+
+log = logging.getLogger(__name__)
+
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Contadores do processo: workbooks abertos, folhas descodificadas e folhas vindas da cache
+read_counts = Counter()
+
+
+def find_workbook(prefix, year, directory=DATA_DIR):
+    """Path of Quadros_YYYY / Mapas_YYYY (.xlsx preferred over .xls), or None if it is not there."""
+    for ext in ("xlsx", "xls"):
+        path = os.path.join(directory, f"{prefix}_{year}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# === Sessão partilhada sobre um workbook Quadros_YYYY / Mapas_YYYY ===
+class WorkbookSession:
+    """Opens an Excel workbook once and serves any number of sheet reads from it.
+
+    Decoded sheets are also kept in an on-disk SheetCache, so a warm run only
+    deserializes the sheets it asks for and never opens the Excel engine.
+    Pass cache=False to always decode from the workbook.
+
+    reader picks the backend that decodes the file (see readers.READERS): "pandas"
+    (xlrd/openpyxl) or "calamine"; a backend that is not installed, or that cannot
+    open the file, falls back to "pandas".
+
+    With stream=True (.xlsx only) sheets are read row by row from a read-only
+    openpyxl workbook and reads given stop_at end at the first row containing
+    that marker. memory_budget (bytes) caps what a streamed sheet may allocate;
+    going over raises MemoryError.
+    """
+
+    def __init__(self, path, cache=True, stream=False, memory_budget=None, reader=None):
+        self.path = path
+        self.reader = get_reader(reader)
+        self.cache = SheetCache() if cache is True else (cache or None)
+        self.stream = stream and str(path).lower().endswith(".xlsx")
+        self.memory_budget = memory_budget
+        self.stream_stats = {"sheets": 0, "rows": 0, "peak_bytes": 0}
+        self._book = None
+        self._excel = None
+        self._hash = None
+        self._sheets = {}
+        self._index = None
+        self.last_map = None
+        self.open_seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def excel(self):
+        # Descodifica o ficheiro (BIFF ou OOXML) uma única vez, e só se for preciso
+        if self._excel is None:
+            if self.stream:
+                # Reaproveita o workbook read-only do modo streaming em vez de o abrir outra vez
+                self._excel = pd.ExcelFile(self.book, engine="openpyxl")
+            else:
+                inicio = time.perf_counter()
+                with PERFIL.stage("open"):
+                    try:
+                        self._excel = self.reader.open(self.path)
+                    except Exception as e:
+                        if self.reader.name == DEFAULT_READER:
+                            raise
+                        log.warning("⚠️ %s não abriu %s (%s); a usar %s", self.reader.name, self.path, e, DEFAULT_READER)
+                        self.reader = READERS[DEFAULT_READER]
+                        self._excel = self.reader.open(self.path)
+                self.open_seconds += time.perf_counter() - inicio
+                read_counts["opens"] += 1
+        return self._excel
+
+    @property
+    def book(self):
+        """Read-only openpyxl workbook used by the streaming mode."""
+        if self._book is None:
+            inicio = time.perf_counter()
+            with PERFIL.stage("open"):
+                self._book = openpyxl.load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+            self.open_seconds += time.perf_counter() - inicio
+            read_counts["opens"] += 1
+        return self._book
+
+    @property
+    def hash(self):
+        if self._hash is None:
+            self._hash = file_sha256(self.path)
+        return self._hash
+
+    @property
+    def sheet_names(self):
+        if self.cache is None:
+            return self.excel.sheet_names
+        names = self.cache.get_json(self.hash, "sheets")
+        if names is None:
+            names = self.excel.sheet_names
+            self.cache.put_json(self.hash, "sheets", list(names))
+        return names
+
+    @property
+    def sheets_read(self):
+        """Names of the sheets read so far in this session, in the order they were first read."""
+        return list(dict.fromkeys(sheet for sheet, _ in self._sheets))
+
+    @property
+    def index(self):
+        """SheetIndex of quadro titles, built from the title cells only and cached per workbook."""
+        if self._index is None:
+            with PERFIL.stage("index"):
+                self._index = SheetIndex.for_workbook(self)
+        return self._index
+
+    def read(self, sheet_name, stop_at=None, layout=None, **kwargs):
+        """Same arguments as pd.read_excel; repeated reads of a sheet are served from memory.
+
+        stop_at only takes effect in streaming mode: the sheet is then cut right after
+        the first row with a cell containing it (case-insensitive).
+        With a layouts.Layout only its row window and columns are decoded; the columns
+        come back at their sheet positions, with the ones not read left empty.
+        """
+        stream = self.stream
+        options = repr(sorted(kwargs.items()) + ([("stop_at", stop_at)] if stream else [])
+                       + ([("layout", tuple(layout))] if layout else [])
+                       + ([("reader", self.reader.name)] if self.reader.name != DEFAULT_READER and not stream else []))
+        key = (sheet_name, options)
+        if key not in self._sheets:
+            with PERFIL.stage("cache", sheet_name):
+                df = self.cache.get(self.hash, sheet_name, options) if self.cache else None
+            if df is None:
+                leitura = read_options(layout, kwargs) if layout else kwargs
+                # O workbook abre-se fora do tempo de descodificação da folha (conta como "open")
+                excel = self.book if stream else self.excel
+                with PERFIL.stage("decode", sheet_name):
+                    df = self._read_stream(sheet_name, stop_at, leitura) if stream else excel.parse(sheet_name, **leitura)
+                    if layout:
+                        df = expand(layout, df)
+                read_counts["decoded"] += 1
+                PERFIL.count("rows_decoded", len(df), sheet_name)
+                PERFIL.count("cells_decoded", df.size, sheet_name)
+                if self.cache:
+                    with PERFIL.stage("cache", sheet_name):
+                        self.cache.put(self.hash, sheet_name, options, df)
+            else:
+                read_counts["cached"] += 1
+                PERFIL.count("sheets_cached", 1, sheet_name)
+            self._sheets[key] = df
+        # Os scripts alteram o DataFrame (colunas, cortes), por isso devolve-se uma cópia
+        return self._sheets[key].copy()
+
+    def _read_stream(self, sheet_name, stop_at, kwargs):
+        sheet = self.book[sheet_name]
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            # Com nrows só se lê o cabeçalho e essas linhas, como o pd.read_excel
+            nrows = kwargs.pop("nrows", None)
+            max_rows = kwargs.get("header", 0) + 1 + nrows if nrows is not None else None
+            data = _stream_sheet_data(sheet, stop_at, self.memory_budget, max_rows)
+            # Mesma conversão que o pd.read_excel faz às linhas lidas
+            df = TextParser(data, skip_blank_lines=False, **{"header": 0, **kwargs}).read() if data else pd.DataFrame()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if tracing:
+                tracemalloc.stop()
+        if self.memory_budget and peak > self.memory_budget:
+            raise MemoryError(f"{sheet_name}: {peak} bytes excedem o orçamento de {self.memory_budget} bytes")
+        self.stream_stats["sheets"] += 1
+        self.stream_stats["rows"] += len(data)
+        self.stream_stats["peak_bytes"] = max(self.stream_stats["peak_bytes"], peak)
+        return df
+
+    def stream_report(self):
+        stats = self.stream_stats
+        budget = f" (orçamento {self.memory_budget / 2**20:.0f} MB)" if self.memory_budget else ""
+        return (f"streaming: {stats['sheets']} folha(s), {stats['rows']} linhas lidas, "
+                f"pico {stats['peak_bytes'] / 2**10:.0f} KB por folha{budget}")
+
+    def map_sheets(self, func, sheet_names, workers=None, **kwargs):
+        """Decodes each sheet (read kwargs) and applies func(sheet_name, df) to it.
+
+        With workers > 1 the sheets are split across that many processes, each
+        opening the workbook once; func must then be a module-level function.
+        Returns [(sheet_name, result, error)] in the order of sheet_names.
+        """
+        inicio, aberto = time.perf_counter(), self.open_seconds
+        indexed = list(enumerate(sheet_names))
+        if not workers or workers <= 1 or len(indexed) <= 1:
+            workers = 1
+            rows = _apply_to_sheets(self, func, indexed, kwargs)
+            opens = [self.open_seconds - aberto]
+        else:
+            workers = min(workers, len(indexed))
+            chunks = [indexed[i::workers] for i in range(workers)]
+            options = {"cache": self.cache or False, "stream": self.stream, "memory_budget": self.memory_budget,
+                       "reader": self.reader.name}
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_map_chunk, self.path, options, func, chunk, kwargs) for chunk in chunks]
+                results = [future.result() for future in futures]
+            rows = [row for chunk_rows, _, _, _, _ in results for row in chunk_rows]
+            opens = [open_seconds for _, open_seconds, _, _, _ in results]
+            for _, _, stats, counts, perfil in results:
+                read_counts.update(counts)
+                PERFIL.merge(perfil)
+                self.stream_stats["sheets"] += stats["sheets"]
+                self.stream_stats["rows"] += stats["rows"]
+                self.stream_stats["peak_bytes"] = max(self.stream_stats["peak_bytes"], stats["peak_bytes"])
+        rows.sort(key=lambda row: row[0])
+        # Em série seria preciso abrir o workbook uma vez e tratar cada folha a seguir
+        self.last_map = {
+            "sheets": len(rows),
+            "workers": workers,
+            "wall_seconds": time.perf_counter() - inicio,
+            "sheet_seconds": sum(row[4] for row in rows),
+            "open_seconds": max(opens),
+        }
+        return [(sheet, result, error) for _, sheet, result, error, _ in rows]
+
+    def map_report(self):
+        stats = self.last_map
+        if not stats:
+            return ""
+        serial = stats["sheet_seconds"] + stats["open_seconds"]
+        speedup = serial / stats["wall_seconds"] if stats["wall_seconds"] else 1.0
+        report = (f"⏱ {stats['sheets']} quadros em {stats['wall_seconds']:.2f}s com {stats['workers']} processo(s) "
+                  f"(em série ≈ {serial:.2f}s, speedup {speedup:.1f}x)")
+        return f"{report}; {self.stream_report()}" if self.stream else report
+
+    def close(self):
+        self._sheets.clear()
+        if self._excel is not None:
+            self._excel.close()
+            self._excel = None
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+
+
+@contextlib.contextmanager
+def open_workbook(path, workbook=None, **options):
+    """WorkbookSession on path, or the session already given (left open for whoever opened it)."""
+    if workbook is not None:
+        yield workbook
+        return
+    with WorkbookSession(path, **options) as session:
+        yield session
+
+
+# === Execução de map_sheets (no processo principal ou num worker) ===
+def _apply_to_sheets(workbook, func, indexed, kwargs):
+    rows = []
+    for index, sheet in indexed:
+        inicio, aberto = time.perf_counter(), workbook.open_seconds
+        try:
+            with PERFIL.sheet(sheet):
+                result, error = func(sheet, workbook.read(sheet, **kwargs)), None
+        except MemoryError:
+            # Orçamento de memória excedido: pára a extração em vez de saltar o quadro
+            raise
+        except Exception as e:
+            result, error = None, e
+        # O tempo de abrir o workbook (primeira leitura sem cache) não conta como tempo da folha
+        elapsed = time.perf_counter() - inicio - (workbook.open_seconds - aberto)
+        rows.append((index, sheet, result, error, elapsed))
+    return rows
+
+
+def _map_chunk(path, options, func, indexed, kwargs):
+    antes = Counter(read_counts)
+    PERFIL.reset()
+    with WorkbookSession(path, **options) as workbook:
+        rows = _apply_to_sheets(workbook, func, indexed, kwargs)
+        return rows, workbook.open_seconds, workbook.stream_stats, read_counts - antes, PERFIL.report()
+
+
+# === Leitura em streaming (.xlsx) ===
+def _convert_cell(cell):
+    # Igual ao leitor openpyxl do pandas: vazio → "", erro → NaN, inteiros como int
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _stream_sheet_data(sheet, stop_at, memory_budget, max_rows=None):
+    """Rows of a read-only sheet as pd.read_excel would see them, up to the stop_at row
+    (and at most max_rows rows)."""
+    sheet.reset_dimensions()
+    marker = stop_at.upper() if stop_at else None
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(sheet.rows):
+        converted = [_convert_cell(cell) for cell in row]
+        while converted and converted[-1] == "":
+            converted.pop()
+        if converted:
+            last_row_with_data = row_number
+        data.append(converted)
+        if memory_budget and row_number % 16 == 0 and tracemalloc.get_traced_memory()[0] > memory_budget:
+            raise MemoryError(f"{sheet.title}: orçamento de {memory_budget} bytes excedido na linha {row_number}")
+        if marker and any(isinstance(value, str) and marker in value.upper() for value in converted):
+            break
+        if max_rows is not None and len(data) >= max_rows:
+            break
+    data = data[:last_row_with_data + 1]
+    if data:
+        width = max(len(row) for row in data)
+        data = [row + [""] * (width - len(row)) for row in data]
+    return data